@@ -0,0 +1,120 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteStorage(BaseStorage):
+    # FSM state survives restarts in a SQLite file; recently used keys are
+    # kept in a bounded in-memory front cache, so memory no longer grows with
+    # the number of users who ever started a flow.
+    def __init__(self, path: Path, cache_size: int = 1024) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm (key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL DEFAULT '{}')"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+        self._cache: "OrderedDict[str, Tuple[Optional[str], Dict[str, Any]]]" = OrderedDict()
+        self._cache_size = cache_size
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._write(_make_key(key), "state", value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _data = await self._read(_make_key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._write(_make_key(key), "data", dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _state, data = await self._read(_make_key(key))
+        return data.copy()
+
+    async def close(self) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._conn.close)
+
+    async def _read(self, storage_key: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        entry = self._cache.get(storage_key)
+        if entry is not None:
+            self._cache.move_to_end(storage_key)
+            return entry
+        async with self._lock:
+            return await self._load(storage_key)
+
+    async def _load(self, storage_key: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        # Caller holds self._lock, so a concurrent write cannot slip in between
+        # the SELECT and the front-cache update.
+        entry = self._cache.get(storage_key)
+        if entry is not None:
+            return entry
+
+        def _select() -> Tuple[Optional[str], Dict[str, Any]]:
+            row = self._conn.execute("SELECT state, data FROM fsm WHERE key = ?", (storage_key,)).fetchone()
+            if row is None:
+                return None, {}
+            return row[0], json.loads(row[1])
+
+        entry = await asyncio.to_thread(_select)
+        self._remember(storage_key, entry)
+        return entry
+
+    async def _write(self, storage_key: str, column: str, value: Any) -> None:
+        # The read-modify-write of (state, data) happens under one lock, so
+        # concurrent set_state/set_data on the same key never write back a
+        # stale copy of the other column.
+        async with self._lock:
+            state, data = await self._load(storage_key)
+            if column == "state":
+                state = value
+            else:
+                data = value
+
+            def _upsert() -> None:
+                with self._conn:
+                    if state is None and not data:
+                        # Nothing left to resume; keep the table small.
+                        self._conn.execute("DELETE FROM fsm WHERE key = ?", (storage_key,))
+                    else:
+                        self._conn.execute(
+                            "INSERT INTO fsm (key, state, data) VALUES (?, ?, ?) "
+                            "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data",
+                            (storage_key, state, json.dumps(data, ensure_ascii=False)),
+                        )
+
+            await asyncio.to_thread(_upsert)
+            self._remember(storage_key, (state, data))
+
+    def _remember(self, storage_key: str, entry: Tuple[Optional[str], Dict[str, Any]]) -> None:
+        self._cache[storage_key] = entry
+        self._cache.move_to_end(storage_key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+
+def _make_key(key: StorageKey) -> str:
+    return ":".join(
+        str(part)
+        for part in (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            getattr(key, "business_connection_id", None),
+            key.destiny,
+        )
+    )
@@ -6,8 +6,9 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from app.services.delete_service import DeleteCandidate, DeleteService
-from app.utils.auth import is_allowed, user_label
+from app.services.container import Services
+from app.services.delete_service import DeleteCandidate
+from app.utils.auth import AuthConfig, is_allowed, user_label
 
 logger = logging.getLogger(__name__)
 
@@ -57,16 +58,12 @@ async def _safe_edit(callback: CallbackQuery, text: str, reply_markup: InlineKey
         await callback.message.answer(text, reply_markup=reply_markup.as_markup() if reply_markup else None)
 
 
-def create_delete_router(
-    delete_service: DeleteService,
-    allowed_user_ids: list[int],
-    allowed_usernames: list[str],
-) -> Router:
+def create_delete_router(services: Services, *, auth: AuthConfig) -> Router:
     router = Router()
 
     @router.callback_query(F.data == "del:cancel")
     async def cancel_delete(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.clear()
@@ -75,7 +72,7 @@ def create_delete_router(
 
     @router.callback_query(F.data.startswith("del:pick:"))
     async def pick_delete(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
 
@@ -119,7 +116,7 @@ def create_delete_router(
 
     @router.callback_query(DeleteState.confirming, F.data == "del:back")
     async def back_to_list(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         data = await state.get_data()
@@ -159,7 +156,7 @@ def create_delete_router(
 
     @router.callback_query(DeleteState.confirming, F.data == "del:confirm")
     async def confirm_delete(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         data = await state.get_data()
@@ -181,7 +178,7 @@ def create_delete_router(
             row_values=candidate_dict["row_values"],
             preview=candidate_dict["preview"],
         )
-        deleted, inbox_deleted = await delete_service.delete_candidate(candidate)
+        deleted, inbox_deleted = await services.delete.delete_candidate(candidate)
         await state.clear()
         if deleted:
             if inbox_deleted:
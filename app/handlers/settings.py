@@ -11,9 +11,8 @@ from datetime import date, datetime
 
 from app.prompts import DEFAULT_EXTRACT_USER, DEFAULT_ROUTER_USER, EXTRACT_PROMPT_KEY, ROUTER_PROMPT_KEY
 from app.services.bot_settings_service import BotSettingsService
-from app.services.summary_service import SummaryService
-from app.services.sheets_service import SheetsService
-from app.utils.auth import is_allowed, user_label
+from app.services.container import Services
+from app.utils.auth import AuthConfig, is_allowed, user_label
 
 logger = logging.getLogger(__name__)
 
@@ -25,26 +24,20 @@ class SettingsState(StatesGroup):
     editing_timezone = State()
 
 
-def create_settings_router(
-    sheets_service: SheetsService,
-    settings_service: BotSettingsService,
-    summary_service: SummaryService,
-    allowed_user_ids: list[int],
-    allowed_usernames: list[str],
-) -> Router:
+def create_settings_router(services: Services, *, auth: AuthConfig) -> Router:
     router = Router()
 
     @router.message(Command("settings"))
     async def settings_menu(message: Message) -> None:
-        if not is_allowed(message.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(message.from_user, auth):
             logger.warning("Unauthorized user: %s", user_label(message.from_user))
             await message.answer("⛔️ Доступ запрещен.")
             return
 
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         if settings.summary_chat_id is None:
-            await settings_service.update({"summary_chat_id": message.chat.id})
-            settings = await settings_service.load()
+            await services.settings.update({"summary_chat_id": message.chat.id})
+            settings = await services.settings.load()
         kb = _build_main_menu(settings)
         text = (
             "⚙️ Меню настроек.\n\n"
@@ -60,11 +53,11 @@ def create_settings_router(
 
     @router.callback_query(F.data == "menu:main")
     async def show_main_menu(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.clear()
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         kb = _build_main_menu(settings)
         text = (
             "⚙️ Меню настроек.\n\n"
@@ -81,12 +74,12 @@ def create_settings_router(
 
     @router.callback_query(F.data == "output:toggle_safe")
     async def toggle_safe_output(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
-        settings = await settings_service.load()
-        await settings_service.update({"safe_output": not settings.safe_output})
-        settings = await settings_service.load()
+        settings = await services.settings.load()
+        await services.settings.update({"safe_output": not settings.safe_output})
+        settings = await services.settings.load()
         kb = _build_main_menu(settings)
         text = (
             "⚙️ Меню настроек.\n\n"
@@ -103,11 +96,11 @@ def create_settings_router(
 
     @router.callback_query(F.data == "menu:models")
     async def show_models_menu(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.clear()
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         kb = _build_models_menu(settings.openai_model)
         await _show_menu(
             callback,
@@ -121,19 +114,19 @@ def create_settings_router(
 
     @router.callback_query(F.data.startswith("model:set:"))
     async def set_model(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         model = callback.data.split(":", 2)[2]
-        await settings_service.update({"openai_model": model})
-        settings = await settings_service.load()
+        await services.settings.update({"openai_model": model})
+        settings = await services.settings.load()
         kb = _build_models_menu(settings.openai_model)
         await _show_menu(callback, f"✅ Модель изменена на {model}.", kb)
         await callback.answer()
 
     @router.callback_query(F.data == "menu:prompts")
     async def show_prompts_menu(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.clear()
@@ -143,18 +136,18 @@ def create_settings_router(
 
     @router.callback_query(F.data == "menu:summaries")
     async def show_summaries_menu(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.clear()
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         kb = _build_summaries_menu(settings)
         await _show_menu(callback, "Сводки (приходят в этот чат):", kb)
         await callback.answer()
 
     @router.callback_query(F.data == "menu:timezone")
     async def show_timezone_menu(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.set_state(SettingsState.editing_timezone)
@@ -168,7 +161,7 @@ def create_settings_router(
 
     @router.callback_query(F.data == "menu:help")
     async def show_help(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         
@@ -201,11 +194,11 @@ def create_settings_router(
 
     @router.callback_query(F.data == "prompt:show")
     async def show_prompts(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
 
-        prompts = await sheets_service.get_prompts()
+        prompts = await services.sheets.get_prompts()
         router_prompt = prompts.get(ROUTER_PROMPT_KEY, DEFAULT_ROUTER_USER)
         extract_prompt = prompts.get(EXTRACT_PROMPT_KEY, DEFAULT_EXTRACT_USER)
 
@@ -221,7 +214,7 @@ def create_settings_router(
 
     @router.callback_query(F.data == "prompt:router")
     async def edit_router_prompt(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.set_state(SettingsState.editing_prompt)
@@ -237,7 +230,7 @@ def create_settings_router(
 
     @router.callback_query(F.data == "prompt:extract")
     async def edit_extract_prompt(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.set_state(SettingsState.editing_prompt)
@@ -254,41 +247,41 @@ def create_settings_router(
 
     @router.callback_query(F.data == "summary:set_chat")
     async def set_summary_chat(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         chat_id = callback.message.chat.id
-        await settings_service.update({"summary_chat_id": chat_id})
-        settings = await settings_service.load()
+        await services.settings.update({"summary_chat_id": chat_id})
+        settings = await services.settings.load()
         kb = _build_summaries_menu(settings)
         await _show_menu(callback, "✅ Этот чат установлен для сводок.", kb)
         await callback.answer()
 
     @router.callback_query(F.data == "summary:toggle_daily")
     async def toggle_daily(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
-        settings = await settings_service.load()
-        await settings_service.update({"daily_enabled": not settings.daily_enabled})
-        settings = await settings_service.load()
+        settings = await services.settings.load()
+        await services.settings.update({"daily_enabled": not settings.daily_enabled})
+        settings = await services.settings.load()
         await _show_menu(callback, "✅ Режим ежедневных сводок обновлён.", _build_summaries_menu(settings))
         await callback.answer()
 
     @router.callback_query(F.data == "summary:toggle_weekly")
     async def toggle_weekly(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
-        settings = await settings_service.load()
-        await settings_service.update({"weekly_enabled": not settings.weekly_enabled})
-        settings = await settings_service.load()
+        settings = await services.settings.load()
+        await services.settings.update({"weekly_enabled": not settings.weekly_enabled})
+        settings = await services.settings.load()
         await _show_menu(callback, "✅ Режим еженедельных сводок обновлён.", _build_summaries_menu(settings))
         await callback.answer()
 
     @router.callback_query(F.data == "summary:daily_time")
     async def edit_daily_time(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.set_state(SettingsState.editing_daily_time)
@@ -303,7 +296,7 @@ def create_settings_router(
 
     @router.callback_query(F.data == "summary:weekly_time")
     async def edit_weekly_time(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.set_state(SettingsState.editing_weekly_time)
@@ -318,7 +311,7 @@ def create_settings_router(
 
     @router.callback_query(F.data == "summary:weekly_day")
     async def edit_weekly_day(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         kb = InlineKeyboardBuilder()
@@ -339,18 +332,18 @@ def create_settings_router(
 
     @router.callback_query(F.data.startswith("summary:set_weekday:"))
     async def set_weekly_day(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         day_code = callback.data.split(":")[-1]
-        await settings_service.update({"weekly_day": day_code})
-        settings = await settings_service.load()
+        await services.settings.update({"weekly_day": day_code})
+        settings = await services.settings.load()
         await _show_menu(callback, "✅ День недели обновлён.", _build_summaries_menu(settings))
         await callback.answer()
 
     @router.callback_query(F.data == "summary:timezone")
     async def edit_timezone(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.set_state(SettingsState.editing_timezone)
@@ -364,15 +357,15 @@ def create_settings_router(
     @router.message(SettingsState.editing_daily_time, F.text)
     async def save_daily_time(message: Message, state: FSMContext) -> None:
         if _is_cancel(message.text):
-            await _cancel_flow(message, state, settings_service)
+            await _cancel_flow(message, state, services.settings)
             return
         time_text = message.text.strip()
         if not _is_valid_time(time_text):
             await message.answer("⚠️ Неверный формат. Пример: 21:00")
             return
-        await settings_service.update({"daily_time": time_text})
+        await services.settings.update({"daily_time": time_text})
         await state.clear()
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         await message.answer(
             "✅ Время ежедневной сводки обновлено.",
             reply_markup=_build_main_menu(settings).as_markup(),
@@ -381,15 +374,15 @@ def create_settings_router(
     @router.message(SettingsState.editing_weekly_time, F.text)
     async def save_weekly_time(message: Message, state: FSMContext) -> None:
         if _is_cancel(message.text):
-            await _cancel_flow(message, state, settings_service)
+            await _cancel_flow(message, state, services.settings)
             return
         time_text = message.text.strip()
         if not _is_valid_time(time_text):
             await message.answer("⚠️ Неверный формат. Пример: 20:00")
             return
-        await settings_service.update({"weekly_time": time_text})
+        await services.settings.update({"weekly_time": time_text})
         await state.clear()
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         await message.answer(
             "✅ Время еженедельной сводки обновлено.",
             reply_markup=_build_main_menu(settings).as_markup(),
@@ -398,7 +391,7 @@ def create_settings_router(
     @router.message(SettingsState.editing_timezone, F.text)
     async def save_timezone(message: Message, state: FSMContext) -> None:
         if _is_cancel(message.text):
-            await _cancel_flow(message, state, settings_service)
+            await _cancel_flow(message, state, services.settings)
             return
         tz = message.text.strip()
         try:
@@ -406,9 +399,9 @@ def create_settings_router(
         except ZoneInfoNotFoundError:
             await message.answer("⚠️ Таймзона не найдена. Пример: Europe/Moscow")
             return
-        await settings_service.update({"timezone": tz})
+        await services.settings.update({"timezone": tz})
         await state.clear()
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         await message.answer(
             "✅ Таймзона обновлена.",
             reply_markup=_build_main_menu(settings).as_markup(),
@@ -416,11 +409,11 @@ def create_settings_router(
 
     @router.message(SettingsState.editing_prompt, F.text)
     async def save_prompt(message: Message, state: FSMContext) -> None:
-        if not is_allowed(message.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(message.from_user, auth):
             await message.answer("⛔️ Доступ запрещен.")
             return
         if _is_cancel(message.text):
-            await _cancel_flow(message, state, settings_service)
+            await _cancel_flow(message, state, services.settings)
             return
 
         data = await state.get_data()
@@ -439,9 +432,9 @@ def create_settings_router(
             )
             return
 
-        await sheets_service.set_prompt(key, text)
+        await services.sheets.set_prompt(key, text)
         await state.clear()
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         await message.answer(
             "✅ Инструкция сохранена.",
             reply_markup=_build_main_menu(settings).as_markup(),
@@ -449,31 +442,31 @@ def create_settings_router(
 
     @router.callback_query(F.data == "summary:send_daily")
     async def send_daily_summary(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         try:
             tz = ZoneInfo(settings.timezone)
         except Exception:
             tz = ZoneInfo("UTC")
         today = datetime.now(tz).date()
-        text, _count = await summary_service.daily_summary(today)
+        text, _count = await services.summary.daily_summary(today)
         await callback.message.answer(text)
         await callback.answer()
 
     @router.callback_query(F.data == "summary:send_weekly")
     async def send_weekly_summary(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         try:
             tz = ZoneInfo(settings.timezone)
         except Exception:
             tz = ZoneInfo("UTC")
         today = datetime.now(tz).date()
-        text, _count = await summary_service.weekly_summary(today)
+        text, _count = await services.summary.weekly_summary(today)
         await callback.message.answer(text)
         await callback.answer()
 
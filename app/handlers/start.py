@@ -5,30 +5,26 @@ from aiogram.filters import Command
 from aiogram.types import CallbackQuery, Message
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from app.services.bot_settings_service import BotSettingsService
-from app.utils.auth import is_allowed, user_label
+from app.services.container import Services
+from app.utils.auth import AuthConfig, is_allowed, user_label
 
 logger = logging.getLogger(__name__)
 
 
-def create_start_router(
-    settings_service: BotSettingsService,
-    allowed_user_ids: list[int],
-    allowed_usernames: list[str],
-) -> Router:
+def create_start_router(services: Services, *, auth: AuthConfig) -> Router:
     router = Router()
 
     @router.message(Command("start"))
     async def start(message: Message) -> None:
-        if not is_allowed(message.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(message.from_user, auth):
             logger.warning("Unauthorized user: %s", user_label(message.from_user))
             await message.answer("⛔️ Доступ запрещен.")
             return
 
-        settings = await settings_service.load()
+        settings = await services.settings.load()
         if settings.summary_chat_id is None:
-            await settings_service.update({"summary_chat_id": message.chat.id})
-            settings = await settings_service.load()
+            await services.settings.update({"summary_chat_id": message.chat.id})
+            settings = await services.settings.load()
         kb = InlineKeyboardBuilder()
         kb.button(text="⚙️ Настройки", callback_data="menu:main")
         kb.adjust(1)
@@ -53,7 +49,7 @@ def create_start_router(
 
     @router.callback_query(F.data == "menu:start")
     async def show_start(callback: CallbackQuery) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         
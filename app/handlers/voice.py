@@ -27,14 +27,11 @@ from app.prompts import (
     ROUTER_PROMPT_KEY,
 )
 from app.handlers.delete import DeleteState, build_delete_keyboard, format_delete_list
-from app.services.bot_settings_service import BotSettingsService
-from app.services.delete_service import DeleteService
-from app.services.intent_service import IntentService
+from app.services.container import Services
 from app.services.openai_service import OpenAIService
-from app.services.qa_service import QAService
 from app.services.router_service import RouterService
 from app.services.sheets_service import SheetsService
-from app.utils.auth import is_allowed, user_label
+from app.utils.auth import AuthConfig, is_allowed, user_label
 
 logger = logging.getLogger(__name__)
 
@@ -61,22 +58,12 @@ class ThinkingState(StatesGroup):
     waiting_choice = State()
 
 
-def create_voice_router(
-    openai_service: OpenAIService,
-    sheets_service: SheetsService,
-    router_service: RouterService,
-    intent_service: IntentService,
-    settings_service: BotSettingsService,
-    qa_service: QAService,
-    delete_service: DeleteService,
-    allowed_user_ids: list[int],
-    allowed_usernames: list[str],
-) -> Router:
+def create_voice_router(services: Services, *, auth: AuthConfig) -> Router:
     router = Router()
 
     @router.message(F.voice)
     async def handle_voice(message: Message, bot: Bot, state: FSMContext) -> None:
-        if not is_allowed(message.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(message.from_user, auth):
             logger.warning("Unauthorized user: %s", user_label(message.from_user))
             await message.answer("⛔️ Доступ запрещен.")
             return
@@ -114,13 +101,16 @@ def create_voice_router(
             logger.info("Отправляю в Whisper")
             step_start = asyncio.get_running_loop().time()
             transcribe_timeout = max(180, min(MAX_TRANSCRIBE_TIMEOUT, int(message.voice.duration * 3)))
-            transcript = await asyncio.wait_for(openai_service.transcribe(temp_path), timeout=transcribe_timeout)
+            transcript = await asyncio.wait_for(
+                services.openai.transcribe(temp_path, content_type=message.voice.mime_type),
+                timeout=transcribe_timeout,
+            )
             if not transcript:
                 raise ValueError("Empty transcription")
             logger.info("Транскрипция готова за %.2fs, символов=%s", asyncio.get_running_loop().time() - step_start, len(transcript))
 
             logger.info("Читаю настройки бота")
-            bot_settings = await settings_service.load()
+            bot_settings = await services.settings.load()
             model = bot_settings.openai_model
             try:
                 tz = ZoneInfo(bot_settings.timezone)
@@ -137,7 +127,7 @@ def create_voice_router(
                 await _handle_thinking_mode(
                     status_msg,
                     state,
-                    openai_service,
+                    services.openai,
                     transcript,
                     today_str,
                     model,
@@ -145,20 +135,20 @@ def create_voice_router(
                 return
 
             logger.info("Определяю намерение пользователя")
-            intent = await intent_service.detect(transcript, model=model)
+            intent = await services.intent.detect(transcript, model=model)
             action = intent.get("action", "add")
             query = intent.get("query", transcript)
 
             if action == "ask":
                 logger.info("Режим вопроса")
                 await status_msg.edit_text("⏳ Ищу по базе, это может занять до минуты.")
-                answer = await qa_service.answer_question(query or transcript, model=model)
+                answer = await services.qa.answer_question(query or transcript, model=model)
                 await _send_long_text(status_msg, message, answer, safe_mode=bot_settings.safe_output)
                 return
 
             if action == "delete":
                 logger.info("Режим удаления")
-                candidates = await delete_service.find_candidates(query or transcript, limit=7)
+                candidates = await services.delete.find_candidates(query or transcript, limit=7)
                 if not candidates:
                     await status_msg.edit_text("⚠️ Не нашел записей для удаления.")
                     return
@@ -181,11 +171,11 @@ def create_voice_router(
                 return
 
             logger.info("Читаю Settings из Google Sheets")
-            settings = await sheets_service.load_settings()
+            settings = await services.sheets.load_settings()
             logger.info("Категорий найдено: %s", len(settings))
 
             logger.info("Читаю Prompts из Google Sheets")
-            prompts = await sheets_service.get_prompts()
+            prompts = await services.sheets.get_prompts()
             router_prompt = prompts.get(ROUTER_PROMPT_KEY, DEFAULT_ROUTER_USER)
             extract_prompt = prompts.get(EXTRACT_PROMPT_KEY, DEFAULT_EXTRACT_USER)
 
@@ -195,7 +185,7 @@ def create_voice_router(
                 logger.info("Пользователь явно указал категорию: %s", category)
             else:
                 multi_items = await _split_multi_items(
-                    openai_service,
+                    services.openai,
                     transcript,
                     settings,
                     model,
@@ -205,8 +195,8 @@ def create_voice_router(
                         status_msg,
                         message,
                         state,
-                        sheets_service,
-                        router_service,
+                        services.sheets,
+                        services.router,
                         settings,
                         extract_prompt,
                         today_str,
@@ -219,7 +209,7 @@ def create_voice_router(
                 logger.info("Классифицирую категорию (model=%s)", model)
                 try:
                     category, _reasoning = await asyncio.wait_for(
-                        router_service.classify_category(transcript, settings, router_prompt, model=model),
+                        services.router.classify_category(transcript, settings, router_prompt, model=model),
                         timeout=60,
                     )
                 except Exception:
@@ -236,7 +226,7 @@ def create_voice_router(
                 logger.info("Определил категорию: %s", category)
 
             logger.info("Читаю заголовки листа: %s", category)
-            headers = await sheets_service.get_headers(category)
+            headers = await services.sheets.get_headers(category)
             if not headers:
                 raise ValueError("No headers found in target sheet")
             logger.info("Нашел столбцы: %s", headers)
@@ -244,7 +234,7 @@ def create_voice_router(
             logger.info("Извлекаю данные под заголовки (model=%s)", model)
             clean_headers = [_clean_header(header) for header in headers]
             row = await asyncio.wait_for(
-                router_service.extract_row(transcript, clean_headers, today_str, extract_prompt, model=model),
+                services.router.extract_row(transcript, clean_headers, today_str, extract_prompt, model=model),
                 timeout=60,
             )
             row = _apply_text_fields(headers, row, transcript)
@@ -282,7 +272,7 @@ def create_voice_router(
                 )
                 return
 
-            duplicate_preview = await _find_duplicate(sheets_service, category, headers, row)
+            duplicate_preview = await _find_duplicate(services.sheets, category, headers, row)
             if duplicate_preview:
                 await state.set_state(DuplicateState.confirming)
                 await state.update_data(
@@ -301,10 +291,10 @@ def create_voice_router(
                 )
                 return
 
-            logger.info("Записываю строку в лист: %s", category)
-            await sheets_service.append_row(category, row)
-            logger.info("Пишу в Inbox")
-            await sheets_service.append_row("Inbox", [today_str, category, transcript])
+            logger.info("Записываю строку в лист %s и Inbox", category)
+            await services.sheets.append_rows_batch(
+                [(category, row), ("Inbox", [today_str, category, transcript])]
+            )
             logger.info("Записал строку")
 
             short_text = transcript if len(transcript) <= 300 else transcript[:297] + "..."
@@ -317,19 +307,19 @@ def create_voice_router(
         except json.JSONDecodeError:
             logger.exception("GPT returned invalid JSON")
             await status_msg.edit_text("⚠️ GPT вернул некорректный JSON. Попробуйте еще раз.")
-            await _safe_inbox(sheets_service, today_str, category or "Unknown", transcript)
+            await _safe_inbox(services.sheets, today_str, category or "Unknown", transcript)
         except asyncio.TimeoutError:
             logger.exception("Timeout while processing message")
             await status_msg.edit_text("⚠️ Превышено время ожидания ответа от ИИ. Попробуйте еще раз.")
-            await _safe_inbox(sheets_service, today_str, category or "Unknown", transcript)
+            await _safe_inbox(services.sheets, today_str, category or "Unknown", transcript)
         except WorksheetNotFound:
             logger.exception("Worksheet not found")
             await status_msg.edit_text("⚠️ Не найден лист в Google Sheets. Проверьте название категории.")
-            await _safe_inbox(sheets_service, today_str, category or "Unknown", transcript)
+            await _safe_inbox(services.sheets, today_str, category or "Unknown", transcript)
         except Exception:
             logger.exception("Unhandled error")
             await status_msg.edit_text("⚠️ Ошибка обработки сообщения. Попробуйте еще раз.")
-            await _safe_inbox(sheets_service, today_str, category or "Unknown", transcript)
+            await _safe_inbox(services.sheets, today_str, category or "Unknown", transcript)
         finally:
             if temp_path:
                 try:
@@ -339,7 +329,7 @@ def create_voice_router(
 
     @router.callback_query(IntakeState.waiting_required, F.data == "req:cancel")
     async def cancel_required(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.clear()
@@ -348,7 +338,7 @@ def create_voice_router(
 
     @router.callback_query(IntakeState.waiting_required, F.data == "req:skip")
     async def skip_required(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
 
@@ -366,7 +356,7 @@ def create_voice_router(
                 item["row"] = row
                 pending[_idx] = item
                 await state.update_data(pending_items=pending)
-            await _finalize_multi_item(callback.message, callback.message, state, sheets_service, item, results)
+            await _finalize_multi_item(callback.message, callback.message, state, services.sheets, item, results)
             await callback.answer()
             return
 
@@ -393,7 +383,7 @@ def create_voice_router(
                     row[idx] = ""
             await state.update_data(row=row)
 
-        duplicate_preview = await _find_duplicate(sheets_service, category, headers, row)
+        duplicate_preview = await _find_duplicate(services.sheets, category, headers, row)
         if duplicate_preview:
             await state.set_state(DuplicateState.confirming)
             await state.update_data(
@@ -415,8 +405,9 @@ def create_voice_router(
 
         row = _apply_text_fields(headers, row, transcript)
         row = _apply_date_fields(headers, row, transcript, today_date)
-        await sheets_service.append_row(category, row)
-        await sheets_service.append_row("Inbox", [today_str, category, transcript])
+        await services.sheets.append_rows_batch(
+            [(category, row), ("Inbox", [today_str, category, transcript])]
+        )
         await state.clear()
         short_text = transcript if len(transcript) <= 300 else transcript[:297] + "..."
         short_text = _get_summary_value(headers, row) or short_text
@@ -429,7 +420,7 @@ def create_voice_router(
 
     @router.callback_query(IntakeState.waiting_required, F.data.startswith("req:priority:"))
     async def handle_required_priority(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         value_map = {
@@ -478,7 +469,7 @@ def create_voice_router(
                 return
 
             results = data.get("multi_results", [])
-            await _finalize_multi_item(callback.message, callback.message, state, sheets_service, item, results)
+            await _finalize_multi_item(callback.message, callback.message, state, services.sheets, item, results)
             await callback.answer()
             return
         category = data.get("category", "")
@@ -525,7 +516,7 @@ def create_voice_router(
             await callback.answer()
             return
 
-        duplicate_preview = await _find_duplicate(sheets_service, category, headers, row)
+        duplicate_preview = await _find_duplicate(services.sheets, category, headers, row)
         if duplicate_preview:
             await state.set_state(DuplicateState.confirming)
             await state.update_data(
@@ -547,8 +538,9 @@ def create_voice_router(
 
         row = _apply_text_fields(headers, row, transcript)
         row = _apply_date_fields(headers, row, transcript, today_date)
-        await sheets_service.append_row(category, row)
-        await sheets_service.append_row("Inbox", [today_str, category, transcript])
+        await services.sheets.append_rows_batch(
+            [(category, row), ("Inbox", [today_str, category, transcript])]
+        )
         await state.clear()
         short_text = transcript if len(transcript) <= 300 else transcript[:297] + "..."
         short_text = _get_summary_value(headers, row) or short_text
@@ -561,7 +553,7 @@ def create_voice_router(
 
     @router.callback_query(DuplicateState.confirming, F.data == "dup:add")
     async def confirm_duplicate_add(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         data = await state.get_data()
@@ -589,8 +581,9 @@ def create_voice_router(
 
         row = _apply_text_fields(headers, row, transcript)
         row = _apply_date_fields(headers, row, transcript, today_date)
-        await sheets_service.append_row(category, row)
-        await sheets_service.append_row("Inbox", [today_str, category, transcript])
+        await services.sheets.append_rows_batch(
+            [(category, row), ("Inbox", [today_str, category, transcript])]
+        )
         await state.clear()
         short_text = transcript if len(transcript) <= 300 else transcript[:297] + "..."
         short_text = _get_summary_value(headers, row) or short_text
@@ -603,7 +596,7 @@ def create_voice_router(
 
     @router.callback_query(DuplicateState.confirming, F.data == "dup:skip")
     async def confirm_duplicate_skip(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.clear()
@@ -612,7 +605,7 @@ def create_voice_router(
 
     @router.callback_query(CategoryState.selecting, F.data == "cat:cancel")
     async def cancel_category_pick(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await state.clear()
@@ -621,7 +614,7 @@ def create_voice_router(
 
     @router.callback_query(CategoryState.selecting, F.data.startswith("cat:pick:"))
     async def pick_category(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
 
@@ -643,22 +636,22 @@ def create_voice_router(
         category = categories[index]
 
         try:
-            headers = await sheets_service.get_headers(category)
+            headers = await services.sheets.get_headers(category)
             if not headers:
                 await callback.message.edit_text("⚠️ Не найден список столбцов для категории.")
                 await state.clear()
                 await callback.answer()
                 return
 
-            prompts = await sheets_service.get_prompts()
+            prompts = await services.sheets.get_prompts()
             extract_prompt = prompts.get(EXTRACT_PROMPT_KEY, DEFAULT_EXTRACT_USER)
 
-            bot_settings = await settings_service.load()
+            bot_settings = await services.settings.load()
             model = bot_settings.openai_model
 
             clean_headers = [_clean_header(header) for header in headers]
             row = await asyncio.wait_for(
-                router_service.extract_row(transcript, clean_headers, today_str, extract_prompt, model=model),
+                services.router.extract_row(transcript, clean_headers, today_str, extract_prompt, model=model),
                 timeout=60,
             )
             row = _apply_text_fields(headers, row, transcript)
@@ -699,7 +692,7 @@ def create_voice_router(
                 await callback.answer()
                 return
 
-            duplicate_preview = await _find_duplicate(sheets_service, category, headers, row)
+            duplicate_preview = await _find_duplicate(services.sheets, category, headers, row)
             if duplicate_preview:
                 await state.set_state(DuplicateState.confirming)
                 await state.update_data(
@@ -719,8 +712,9 @@ def create_voice_router(
                 await callback.answer()
                 return
 
-            await sheets_service.append_row(category, row)
-            await sheets_service.append_row("Inbox", [today_str, category, transcript])
+            await services.sheets.append_rows_batch(
+                [(category, row), ("Inbox", [today_str, category, transcript])]
+            )
             await state.clear()
             short_text = transcript if len(transcript) <= 300 else transcript[:297] + "..."
             short_text = _get_summary_value(headers, row) or short_text
@@ -738,7 +732,7 @@ def create_voice_router(
 
     @router.message(IntakeState.waiting_required, F.text)
     async def handle_required_fields(message: Message, state: FSMContext) -> None:
-        if not is_allowed(message.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(message.from_user, auth):
             await message.answer("⛔️ Доступ запрещен.")
             return
 
@@ -763,8 +757,9 @@ def create_voice_router(
         if text.lower() in {"off", "пропустить", "skip"}:
             row = _apply_text_fields(headers, row, transcript)
             row = _apply_date_fields(headers, row, transcript, today_date)
-            await sheets_service.append_row(category, row)
-            await sheets_service.append_row("Inbox", [today_str, category, transcript])
+            await services.sheets.append_rows_batch(
+                [(category, row), ("Inbox", [today_str, category, transcript])]
+            )
             await state.clear()
             short_text = transcript if len(transcript) <= 300 else transcript[:297] + "..."
             short_text = _get_summary_value(headers, row) or short_text
@@ -801,7 +796,7 @@ def create_voice_router(
             await state.update_data(row=row)
             return
 
-        duplicate_preview = await _find_duplicate(sheets_service, category, headers, row)
+        duplicate_preview = await _find_duplicate(services.sheets, category, headers, row)
         if duplicate_preview:
             await state.set_state(DuplicateState.confirming)
             await state.update_data(
@@ -822,8 +817,9 @@ def create_voice_router(
 
         row = _apply_text_fields(headers, row, transcript)
         row = _apply_date_fields(headers, row, transcript, today_date)
-        await sheets_service.append_row(category, row)
-        await sheets_service.append_row("Inbox", [today_str, category, transcript])
+        await services.sheets.append_rows_batch(
+            [(category, row), ("Inbox", [today_str, category, transcript])]
+        )
         await state.clear()
 
         short_text = transcript if len(transcript) <= 300 else transcript[:297] + "..."
@@ -836,7 +832,7 @@ def create_voice_router(
 
     @router.callback_query(ThinkingState.waiting_choice, F.data.startswith("thinking:"))
     async def handle_thinking_choice(callback: CallbackQuery, state: FSMContext) -> None:
-        if not is_allowed(callback.from_user, allowed_user_ids, allowed_usernames):
+        if not is_allowed(callback.from_user, auth):
             await callback.answer("Доступ запрещен", show_alert=True)
             return
         await callback.answer()
@@ -856,11 +852,11 @@ def create_voice_router(
 
         save_text = _build_thinking_inbox_text(structured, transcript)
         try:
-            await sheets_service.append_row("Прочее", [today_str, "Thinking", save_text])
+            await services.sheets.append_row("Прочее", [today_str, "Thinking", save_text])
             await state.clear()
             await callback.message.edit_text("✅ Сохранено в «Прочее».")
         except WorksheetNotFound:
-            await sheets_service.append_row("Inbox", [today_str, "Thinking", save_text])
+            await services.sheets.append_row("Inbox", [today_str, "Thinking", save_text])
             await state.clear()
             await callback.message.edit_text("⚠️ Лист «Прочее» не найден. Сохранил в Inbox.")
 
@@ -1711,8 +1707,9 @@ async def _process_multi_items(
                 results.append(f"⚠️ Дубликат пропущен: {category}")
                 continue
 
-            await sheets_service.append_row(category, row)
-            await sheets_service.append_row("Inbox", [today_str, category, item_text])
+            await sheets_service.append_rows_batch(
+                [(category, row), ("Inbox", [today_str, category, item_text])]
+            )
 
             summary = _get_summary_value(headers, row) or _make_summary(item_text)
             results.append(f"✅ {category}: {summary}")
@@ -1833,8 +1830,9 @@ async def _finalize_multi_item(
     if duplicate_preview:
         results.append(f"⚠️ Дубликат пропущен: {category}")
     else:
-        await sheets_service.append_row(category, row)
-        await sheets_service.append_row("Inbox", [today_str, category, transcript])
+        await sheets_service.append_rows_batch(
+            [(category, row), ("Inbox", [today_str, category, transcript])]
+        )
         summary = _get_summary_value(headers, row) or _make_summary(transcript)
         results.append(f"✅ {category}: {summary}")
 
@@ -1852,6 +1850,10 @@ async def _finalize_multi_item(
 
 
 def _split_text(text: str, max_len: int) -> list[str]:
+    if len(text) <= max_len:
+        if text and not (text[0].isspace() or text[-1].isspace()):
+            return [text]
+        return [text.strip()]
     text = text.strip()
     if len(text) <= max_len:
         return [text]
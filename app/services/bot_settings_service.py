@@ -1,9 +1,14 @@
 import asyncio
 import json
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
@@ -42,14 +47,22 @@ class BotSettings:
 class BotSettingsService:
     def __init__(self, settings_path: Path) -> None:
         self._path = settings_path
+        # (st_mtime_ns, parsed settings): the file is only re-parsed when it
+        # changes, e.g. when edited by hand. Callers always get a copy.
+        self._cached: Optional[Tuple[int, BotSettings]] = None
 
     async def load(self) -> BotSettings:
         def _read() -> BotSettings:
-            if not self._path.exists():
+            try:
+                mtime_ns = self._path.stat().st_mtime_ns
+            except FileNotFoundError:
                 return BotSettings()
-            with self._path.open("r", encoding="utf-8") as file:
-                data = json.load(file)
-            return BotSettings.from_dict(data)
+            cached = self._cached
+            if cached is None or cached[0] != mtime_ns:
+                data = _loads(self._path.read_bytes())
+                cached = (mtime_ns, BotSettings.from_dict(data))
+                self._cached = cached
+            return replace(cached[1])
 
         return await asyncio.to_thread(_read)
 
@@ -57,9 +70,9 @@ class BotSettingsService:
         def _write() -> None:
             self._path.parent.mkdir(parents=True, exist_ok=True)
             temp_path = self._path.with_suffix(".tmp")
-            with temp_path.open("w", encoding="utf-8") as file:
-                json.dump(asdict(settings), file, ensure_ascii=False, indent=2)
+            temp_path.write_bytes(_dumps(asdict(settings)))
             temp_path.replace(self._path)
+            self._cached = (self._path.stat().st_mtime_ns, replace(settings))
 
         await asyncio.to_thread(_write)
 
@@ -72,3 +85,15 @@ class BotSettingsService:
                 logger.warning("Unknown settings key: %s", key)
         await self.save(settings)
         return settings
+
+
+def _loads(raw: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
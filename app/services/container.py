@@ -0,0 +1,23 @@
+from typing import NamedTuple
+
+from app.services.bot_settings_service import BotSettingsService
+from app.services.delete_service import DeleteService
+from app.services.intent_service import IntentService
+from app.services.openai_service import OpenAIService
+from app.services.qa_service import QAService
+from app.services.router_service import RouterService
+from app.services.sheets_service import SheetsService
+from app.services.summary_service import SummaryService
+
+
+class Services(NamedTuple):
+    # Everything the routers need, built once in main() and handed to every
+    # create_*_router factory as a single argument.
+    openai: OpenAIService
+    sheets: SheetsService
+    router: RouterService
+    intent: IntentService
+    settings: BotSettingsService
+    qa: QAService
+    delete: DeleteService
+    summary: SummaryService
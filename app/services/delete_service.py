@@ -1,13 +1,18 @@
+import functools
+import heapq
 import logging
 import re
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from app.services.sheets_service import SheetsService
 
 logger = logging.getLogger(__name__)
 
+_TOKEN_RE = re.compile(r"[a-zа-я0-9]+")
+_LAST_DAYS_RE = re.compile(r"(?:за\s+последн\w*|последн\w*|за\s+прошл\w*|last)\s+(\d+)\s*(?:дн\w*|days)")
+
 
 @dataclass
 class DeleteCandidate:
@@ -23,33 +28,47 @@ class DeleteService:
         self._sheets = sheets_service
 
     async def find_candidates(self, query: str, limit: int = 7) -> List[DeleteCandidate]:
+        if limit <= 0:
+            return []
         exclude = {"settings", "prompts", "inbox", "botsettings"}
         sheet_names = await self._sheets.list_worksheets()
         tokens = _tokenize(query)
         filters = _infer_filters(query)
         tokens = [token for token in tokens if token not in _STOP_WORDS]
-        candidates: List[Tuple[int, DeleteCandidate]] = []
-
-        for name in sheet_names:
-            if name.strip().lower() in exclude:
-                continue
-            if filters.sheet_keywords and not _match_sheet(name, filters.sheet_keywords):
-                continue
-            rows = await self._sheets.get_all_values(name)
+        # Min-heap of the best `limit` rows keyed by (score, -order): ties keep
+        # the earliest rows, as the previous stable sort did.
+        heap: List[Tuple[int, int, DeleteCandidate]] = []
+        best_possible = len(tokens) if tokens else 1
+        order = 0
+
+        wanted = [
+            name
+            for name in sheet_names
+            if name.strip().lower() not in exclude
+            and (not filters.sheet_keywords or _match_sheet(name, filters.sheet_keywords))
+        ]
+        rows_by_sheet = await self._sheets.batch_get_all_values(wanted)
+
+        for name in wanted:
+            if len(heap) >= limit and heap[0][0] >= best_possible:
+                break
+            rows = rows_by_sheet.get(name)
             if not rows or len(rows) < 2:
                 continue
             headers = rows[0]
-            date_idx = _find_date_index(headers) if filters.start_date else None
-            for row_idx, row in enumerate(rows[1:], start=2):
-                if not any(cell.strip() for cell in row):
+            header_prefixes = [f"{header}: " for header in headers]
+            if filters.start_date:
+                scan_rows = _rows_in_date_range(
+                    rows, _find_date_index(headers), filters.start_date, filters.end_date
+                )
+            else:
+                scan_rows = list(enumerate(rows[1:], start=2))
+            for row_idx, row in scan_rows:
+                if len(heap) >= limit and heap[0][0] >= best_possible:
+                    break
+                if not "".join(row).strip():
                     continue
-                if filters.start_date:
-                    row_date = _extract_row_date(row, headers, date_idx)
-                    if not row_date:
-                        continue
-                    if row_date < filters.start_date or row_date > filters.end_date:
-                        continue
-                record_text = _row_to_text(headers, row)
+                record_text = _row_to_text(header_prefixes, row)
                 score = _score(tokens, record_text)
                 if tokens:
                     if score <= 0:
@@ -58,7 +77,10 @@ class DeleteService:
                     if not (filters.start_date or filters.sheet_keywords):
                         continue
                     score = 1
-                preview = _make_preview(name, headers, row)
+                order += 1
+                if len(heap) >= limit and score <= heap[0][0]:
+                    continue
+                preview = _make_preview(name, header_prefixes, row)
                 candidate = DeleteCandidate(
                     sheet_name=name,
                     row_index=row_idx,
@@ -66,10 +88,13 @@ class DeleteService:
                     row_values=row,
                     preview=preview,
                 )
-                candidates.append((score, candidate))
+                if len(heap) < limit:
+                    heapq.heappush(heap, (score, -order, candidate))
+                else:
+                    heapq.heapreplace(heap, (score, -order, candidate))
 
-        candidates.sort(key=lambda item: item[0], reverse=True)
-        return [candidate for _score_value, candidate in candidates[:limit]]
+        heap.sort(key=lambda item: item[:2], reverse=True)
+        return [candidate for _score_value, _order, candidate in heap]
 
     async def delete_candidate(self, candidate: DeleteCandidate) -> Tuple[bool, bool]:
         await self._sheets.delete_row(candidate.sheet_name, candidate.row_index)
@@ -80,7 +105,6 @@ class DeleteService:
         rows = await self._sheets.get_all_values("Inbox")
         if not rows or len(rows) < 2:
             return False
-        inbox_rows = list(enumerate(rows[1:], start=2))
 
         target_date = _get_date_value(candidate.headers, candidate.row_values)
         target_category = candidate.sheet_name
@@ -89,16 +113,16 @@ class DeleteService:
         best_index: Optional[int] = None
         candidate_tokens = _tokenize(" ".join(candidate.row_values))
 
-        for row_index, row in inbox_rows:
-            if len(row) < 3:
-                continue
-            date_val = row[0].strip()
-            category_val = row[1].strip()
-            transcript = row[2].strip()
-            if target_category and category_val != target_category:
-                continue
-            if target_date and date_val != target_date:
-                continue
+        # Filter on the cheap category/date columns first; only the surviving
+        # transcripts are scored.
+        matching = [
+            (row_index, row[2].lower())
+            for row_index, row in enumerate(rows[1:], start=2)
+            if len(row) >= 3
+            and (not target_category or row[1].strip() == target_category)
+            and (not target_date or row[0].strip() == target_date)
+        ]
+        for row_index, transcript in matching:
             score = _score(candidate_tokens, transcript)
             if score > best_score:
                 best_score = score
@@ -110,21 +134,18 @@ class DeleteService:
         return False
 
 
-def _row_to_text(headers: List[str], row: List[str]) -> str:
-    parts = []
-    for idx, header in enumerate(headers):
-        value = row[idx] if idx < len(row) else ""
-        parts.append(f"{header}: {value}")
-    return " ".join(parts).lower()
+def _row_to_text(header_prefixes: List[str], row: List[str]) -> str:
+    # header_prefixes are the sheet's "<header>: " strings, built once per sheet.
+    row_len = len(row)
+    return " ".join(
+        prefix + (row[idx] if idx < row_len else "") for idx, prefix in enumerate(header_prefixes)
+    ).lower()
 
 
-def _make_preview(sheet_name: str, headers: List[str], row: List[str], max_len: int = 400) -> str:
-    pairs = []
-    for idx, header in enumerate(headers):
-        value = row[idx] if idx < len(row) else ""
-        if value.strip():
-            pairs.append(f"{header}: {value}")
-    preview = "; ".join(pairs)
+def _make_preview(sheet_name: str, header_prefixes: List[str], row: List[str], max_len: int = 400) -> str:
+    # Cells past the header row are ignored and missing cells are empty, so a
+    # plain zip gives the same pairs as indexing with a bounds check.
+    preview = "; ".join(prefix + value for prefix, value in zip(header_prefixes, row) if value.strip())
     if len(preview) > max_len:
         preview = preview[: max_len - 3] + "..."
     return f"[{sheet_name}] {preview}"
@@ -139,15 +160,15 @@ def _get_date_value(headers: List[str], row: List[str]) -> Optional[str]:
 
 
 def _tokenize(text: str) -> List[str]:
-    tokens = re.findall(r"[a-zа-я0-9]+", text.lower())
-    return [token for token in tokens if len(token) > 2]
+    # dict.fromkeys drops repeated tokens but keeps their first-seen order.
+    return list(dict.fromkeys(token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 2))
 
 
-def _score(tokens: List[str], text: str) -> int:
+def _score(tokens: List[str], lowered: str) -> int:
+    # `lowered` must already be lower-cased; tokens come from _tokenize.
     if not tokens:
         return 0
-    lowered = text.lower()
-    return sum(1 for token in tokens if token in lowered)
+    return sum(token in lowered for token in tokens)
 
 
 @dataclass
@@ -180,22 +201,34 @@ _STOP_WORDS = {
 }
 
 
+_SHEET_KW_MAP = {
+    "задач": "tasks",
+    "task": "tasks",
+    "todo": "tasks",
+    "to-do": "tasks",
+    "иде": "ideas",
+    "idea": "ideas",
+    "трат": "expense",
+    "расход": "expense",
+    "expense": "expense",
+    "spend": "expense",
+}
+_SHEET_KIND_KEYWORDS = {
+    "tasks": ("задач", "task"),
+    "ideas": ("иде", "idea"),
+    "expense": ("трат", "расход", "expense", "spend"),
+}
+# Lookahead so overlapping keywords are all reported in a single scan.
+_SHEET_KW_RE = re.compile("(?=(" + "|".join(map(re.escape, _SHEET_KW_MAP)) + "))")
+
+
 def _infer_filters(query: str) -> DeleteFilters:
     lowered = query.lower()
     filters = DeleteFilters()
 
     sheet_keywords: set[str] = set()
-    if any(word in lowered for word in ["задач", "task", "todo", "to-do"]):
-        sheet_keywords.add("задач")
-        sheet_keywords.add("task")
-    if any(word in lowered for word in ["иде", "idea"]):
-        sheet_keywords.add("иде")
-        sheet_keywords.add("idea")
-    if any(word in lowered for word in ["трат", "расход", "expense", "spend"]):
-        sheet_keywords.add("трат")
-        sheet_keywords.add("расход")
-        sheet_keywords.add("expense")
-        sheet_keywords.add("spend")
+    for kind in {_SHEET_KW_MAP[match.group(1)] for match in _SHEET_KW_RE.finditer(lowered)}:
+        sheet_keywords.update(_SHEET_KIND_KEYWORDS[kind])
     filters.sheet_keywords = sheet_keywords or None
 
     today = date.today()
@@ -208,10 +241,7 @@ def _infer_filters(query: str) -> DeleteFilters:
         filters.end_date = today - timedelta(days=2)
         return filters
 
-    match = re.search(
-        r"(?:за\s+последн\w*|последн\w*|за\s+прошл\w*|last)\s+(\d+)\s*(?:дн\w*|days)",
-        lowered,
-    )
+    match = _LAST_DAYS_RE.search(lowered)
     if match:
         days = int(match.group(1))
         days = max(1, min(days, 365))
@@ -247,16 +277,42 @@ def _find_date_index(headers: List[str]) -> int | None:
     return None
 
 
-def _extract_row_date(row: List[str], headers: List[str], idx: int | None) -> date | None:
-    if idx is None or idx >= len(row):
-        return None
-    value = row[idx].strip()
-    return _parse_date(value)
-
-
+def _rows_in_date_range(
+    rows: List[List[str]],
+    idx: int | None,
+    start_date: date,
+    end_date: date,
+) -> List[Tuple[int, List[str]]]:
+    # Column pass over the date cells: each distinct value is parsed once per
+    # sheet and rows outside the range are dropped before any text scoring.
+    if idx is None:
+        return []
+    in_range: Dict[str, bool] = {}
+    kept: List[Tuple[int, List[str]]] = []
+    for row_idx, row in enumerate(rows[1:], start=2):
+        value = row[idx].strip() if idx < len(row) else ""
+        matched = in_range.get(value)
+        if matched is None:
+            row_date = _parse_date(value)
+            matched = row_date is not None and start_date <= row_date <= end_date
+            in_range[value] = matched
+        if matched:
+            kept.append((row_idx, row))
+    return kept
+
+
+@functools.lru_cache(maxsize=4096)
 def _parse_date(value: str) -> date | None:
     if not value:
         return None
+    # Fast path for the DD.MM.YYYY dates the bot itself writes.
+    if len(value) == 10 and value[2] == "." and value[5] == ".":
+        day, month, year = value[:2], value[3:5], value[6:]
+        if day.isdigit() and month.isdigit() and year.isdigit():
+            try:
+                return date(int(year), int(month), int(day))
+            except ValueError:
+                return None
     for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
         try:
             return datetime.strptime(value, fmt).date()
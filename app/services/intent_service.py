@@ -6,6 +6,58 @@ from app.services.openai_service import OpenAIService
 
 logger = logging.getLogger(__name__)
 
+# "не надо" is left out because it matches "мне надо" (I need).
+# "отмени" is left out to avoid confusion with "отметить" (mark).
+_DELETE_KEYWORDS = ["удали", "удалить", "убери", "стереть", "remove", "delete"]
+_QUESTION_KEYWORDS = [
+    "вопрос",
+    "спроси",
+    "узнай",
+    "расскажи",
+    "объясни",
+    "подскажи",
+    "помоги",
+    "покажи",
+    "найди",
+    "напомни",
+    "сколько",
+    "почему",
+    "зачем",
+]
+_ADD_KEYWORDS = [
+    "задача",
+    "идея",
+    "трат",
+    "расход",
+    "потрат",
+    "купил",
+    "купила",
+    "нужно",
+    "надо",
+    "хочу",
+    "запиши",
+    "добавь",
+    "сохрани",
+    "поставь",
+    "напомни",
+    "отметь",
+    "сделать",
+    "сделай",
+    "создать",
+]
+
+
+def _compile_keywords(keywords: list[str]) -> re.Pattern[str]:
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+_DELETE_RE = _compile_keywords(_DELETE_KEYWORDS)
+_QUESTION_KW_RE = _compile_keywords(_QUESTION_KEYWORDS)
+_ADD_RE = _compile_keywords(_ADD_KEYWORDS)
+_QUESTION_PREFIX_RE = re.compile(
+    r"^\s*(что|как|когда|где|почему|зачем|сколько|какие|какая|какой|каких|какими|есть ли|можно ли|нужно ли)\b"
+)
+
 
 class IntentService:
     def __init__(self, openai_service: OpenAIService) -> None:
@@ -14,7 +66,12 @@ class IntentService:
     async def detect(self, text: str, model: str | None = None) -> Dict[str, str]:
         heuristic = _heuristic_intent(text)
         if heuristic:
+            logger.info("Intent resolved without LLM: %s", heuristic["action"])
             return heuristic
+        # Question signals were already checked by the heuristic above.
+        if _looks_like_add(text):
+            logger.info("Intent resolved without LLM: add")
+            return {"action": "add", "query": ""}
 
         system_prompt = (
             "Ты определяешь намерение пользователя. "
@@ -45,9 +102,7 @@ class IntentService:
 
 def _heuristic_intent(text: str) -> Dict[str, str] | None:
     lowered = text.lower()
-    # "не надо" removed because it matches "мне надо" (I need).
-    # "отмени" removed to avoid confusion with "отметить" (mark).
-    if _contains_any(lowered, ["удали", "удалить", "убери", "стереть", "remove", "delete"]):
+    if _DELETE_RE.search(lowered):
         return {"action": "delete", "query": text}
     if _strong_question_signal(lowered):
         return {"action": "ask", "query": text}
@@ -58,63 +113,10 @@ def _strong_question_signal(text: str) -> bool:
     lowered = text.lower()
     if "?" in lowered:
         return True
-    if _contains_any(
-        lowered,
-        [
-            "вопрос",
-            "спроси",
-            "узнай",
-            "расскажи",
-            "объясни",
-            "подскажи",
-            "помоги",
-            "покажи",
-            "найди",
-            "напомни",
-            "сколько",
-            "почему",
-            "зачем",
-        ],
-    ):
+    if _QUESTION_KW_RE.search(lowered):
         return True
-    return bool(
-        re.match(
-            r"^\s*(что|как|когда|где|почему|зачем|сколько|какие|какая|какой|каких|какими|есть ли|можно ли|нужно ли)\b",
-            lowered,
-        )
-    )
+    return bool(_QUESTION_PREFIX_RE.match(lowered))
 
 
 def _looks_like_add(text: str) -> bool:
-    lowered = text.lower()
-    return _contains_any(
-        lowered,
-        [
-            "задача",
-            "идея",
-            "трат",
-            "расход",
-            "потрат",
-            "купил",
-            "купила",
-            "нужно",
-            "надо",
-            "хочу",
-            "запиши",
-            "добавь",
-            "сохрани",
-            "поставь",
-            "напомни",
-            "отметь",
-            "сделать",
-            "сделай",
-            "создать",
-        ],
-    )
-
-
-def _contains_any(text: str, keywords: list[str]) -> bool:
-    for keyword in keywords:
-        if keyword in text:
-            return True
-    return False
+    return _ADD_RE.search(text.lower()) is not None
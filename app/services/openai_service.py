@@ -1,10 +1,21 @@
+import asyncio
+import hashlib
 import json
 import logging
+import mimetypes
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 
+import httpx
 from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
+# Responses sampled above this temperature are too random to replay from cache.
+_CACHE_MAX_TEMPERATURE = 0.5
+
 
 class OpenAIService:
     def __init__(
@@ -13,10 +24,31 @@ class OpenAIService:
         router_model: str = "gpt-4o",
         extract_model: str = "gpt-4o",
         timeout_seconds: float = 600.0,
+        max_retries: int = 3,
+        cache_ttl_seconds: float = 24 * 60 * 60,
+        cache_max_entries: int = 512,
     ) -> None:
-        self._client = AsyncOpenAI(api_key=api_key, timeout=timeout_seconds)
+        # One long-lived pool so Whisper and chat calls reuse warm TLS connections.
+        event_hooks = {"response": [_log_response]} if logger.isEnabledFor(logging.DEBUG) else None
+        self._http_client = httpx.AsyncClient(
+            timeout=timeout_seconds,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=90),
+            event_hooks=event_hooks,
+        )
+        self._client = AsyncOpenAI(
+            api_key=api_key,
+            timeout=timeout_seconds,
+            max_retries=max_retries,
+            http_client=self._http_client,
+        )
         self._router_model = router_model
         self._extract_model = extract_model
+        self._cache_ttl = cache_ttl_seconds
+        self._cache_max_entries = cache_max_entries
+        self._response_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # Identical cacheable requests already on the wire, shared by all callers.
+        self._inflight: Dict[str, "asyncio.Task[str]"] = {}
 
     @property
     def router_model(self) -> str:
@@ -26,13 +58,23 @@ class OpenAIService:
     def extract_model(self) -> str:
         return self._extract_model
 
-    async def transcribe(self, audio_path: str) -> str:
-        with open(audio_path, "rb") as audio_file:
-            response = await self._client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text",
-            )
+    async def close(self) -> None:
+        # The pool is ours, not the SDK's, so it has to be closed explicitly.
+        await self._http_client.aclose()
+
+    async def transcribe(self, audio_path: str, content_type: Optional[str] = None) -> str:
+        def _read() -> bytes:
+            with open(audio_path, "rb") as audio_file:
+                return audio_file.read()
+
+        data = await asyncio.to_thread(_read)
+        if content_type is None:
+            content_type = mimetypes.guess_type(audio_path)[0] or "application/octet-stream"
+        response = await self._client.audio.transcriptions.create(
+            model="whisper-1",
+            file=(os.path.basename(audio_path), data, content_type),
+            response_format="text",
+        )
         text = response if isinstance(response, str) else getattr(response, "text", "")
         return str(text).strip()
 
@@ -45,33 +87,115 @@ class OpenAIService:
         # Fallback to the model itself if it's likely real (e.g. gpt-4o, gpt-4o-mini)
         return model
 
-    async def chat_json(self, system_prompt: str, user_prompt: str, model: str) -> dict:
+    @staticmethod
+    def _cache_key(kind: str, model: str, system_prompt: str, user_prompt: str) -> str:
+        payload = "\x1f".join((kind, model, system_prompt, user_prompt))
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, content = entry
+        if time.monotonic() - stored_at > self._cache_ttl:
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return content
+
+    def _cache_put(self, key: str, content: str) -> None:
+        self._response_cache[key] = (time.monotonic(), content)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > self._cache_max_entries:
+            self._response_cache.popitem(last=False)
+
+    async def _coalesced(self, key: str, request: Callable[[], Awaitable[str]]) -> str:
+        # Concurrent users asking the same thing (same chunk, same summary)
+        # wait on one completion instead of each paying for it.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(request())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _task: self._inflight.pop(key, None))
+        else:
+            logger.debug("Joining in-flight OpenAI request %s", key)
+        # Shielded so one cancelled caller does not cancel the shared request.
+        return await asyncio.shield(task)
+
+    async def chat_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        temperature: float = 0.2,
+    ) -> dict:
         real_model = self._resolve_model(model)
-        response = await self._client.chat.completions.create(
-            model=real_model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.2,
-        )
-        content = response.choices[0].message.content or "{}"
+        use_cache = temperature <= _CACHE_MAX_TEMPERATURE
+        key = self._cache_key("json", real_model, system_prompt, user_prompt)
+        cached = self._cache_get(key) if use_cache else None
+        if cached is not None:
+            return json.loads(cached)
+
+        async def _request() -> str:
+            response = await self._client.chat.completions.create(
+                model=real_model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format={"type": "json_object"},
+                temperature=temperature,
+            )
+            return response.choices[0].message.content or "{}"
+
+        content = await (self._coalesced(key, _request) if use_cache else _request())
         try:
-            return json.loads(content)
+            data = json.loads(content)
         except json.JSONDecodeError as exc:
             logger.error("Bad JSON from OpenAI: %s", content)
             raise exc
+        if use_cache:
+            self._cache_put(key, content)
+        return data
 
-    async def chat_text(self, system_prompt: str, user_prompt: str, model: str) -> str:
+    async def chat_text(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        temperature: float = 0.2,
+    ) -> str:
         real_model = self._resolve_model(model)
-        response = await self._client.chat.completions.create(
-            model=real_model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.2,
-        )
-        content = response.choices[0].message.content or ""
-        return content.strip()
+        use_cache = temperature <= _CACHE_MAX_TEMPERATURE
+        key = self._cache_key("text", real_model, system_prompt, user_prompt)
+        cached = self._cache_get(key) if use_cache else None
+        if cached is not None:
+            return cached
+
+        async def _request() -> str:
+            response = await self._client.chat.completions.create(
+                model=real_model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=temperature,
+            )
+            return (response.choices[0].message.content or "").strip()
+
+        content = await (self._coalesced(key, _request) if use_cache else _request())
+        if use_cache and content:
+            self._cache_put(key, content)
+        return content
+
+
+async def _log_response(response: httpx.Response) -> None:
+    stream = response.extensions.get("network_stream")
+    logger.debug(
+        "OpenAI %s %s -> %s (%s, stream=%s)",
+        response.request.method,
+        response.request.url.path,
+        response.status_code,
+        response.http_version,
+        id(stream) if stream is not None else "-",
+    )
@@ -1,30 +1,55 @@
 import asyncio
+import bisect
+import functools
+import itertools
 import logging
 import re
 from dataclasses import dataclass
-from datetime import date, datetime, timedelta
-from typing import List
+from datetime import date, timedelta
+from typing import Any, Iterator, List
+
+try:
+    import tiktoken
+except ImportError:  # optional: chunk sizes fall back to a character estimate
+    tiktoken = None
 
 from app.services.openai_service import OpenAIService
 from app.services.sheets_service import SheetsService
 
 logger = logging.getLogger(__name__)
 
+# Prompt budget per chunk request, including the system prompt and question.
+CHUNK_TOKEN_BUDGET = 12_000
+
+_LAST_DAYS_RE = re.compile(r"(?:за\s+последн\w*|последн\w*|за\s+прошл\w*|last)\s+(\d+)\s*(?:дн\w*|days)")
+_BLOCK_HEADER_RE = re.compile(r"^(?:🧾\s*)?(\d+)\.\s*(.*)$")
+_MD_TABLE = str.maketrans("", "", "`*")
+_DATE_KEYS = frozenset({"дата", "дата добавления", "date"})
+_DATE_DOT_RE = re.compile(r"([0-9]{1,2})\.([0-9]{1,2})\.([0-9]{4})")
+_DATE_ISO_RE = re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})")
+
 
 class QAService:
-    def __init__(self, openai_service: OpenAIService, sheets_service: SheetsService) -> None:
+    def __init__(
+        self,
+        openai_service: OpenAIService,
+        sheets_service: SheetsService,
+        chunk_concurrency: int = 5,
+    ) -> None:
         self._openai = openai_service
         self._sheets = sheets_service
+        # Shared across questions so parallel users don't multiply the fan-out.
+        self._chunk_sem = asyncio.Semaphore(chunk_concurrency)
 
     async def answer_question(self, question: str, model: str | None = None) -> str:
+        # Chunk and merge prompts are cached by OpenAIService on their exact
+        # text, so collapse transcription whitespace noise to let repeats hit.
+        question = " ".join(question.split())
         filters = _infer_filters(question)
         records = await self._collect_records(filters)
         if not records:
             return "В базе пока нет данных для поиска."
 
-        chunks = _chunk_records(records, max_chars=5000)
-        intermediate_answers: List[str] = []
-
         system_prompt = (
             "Ты помощник поиска по личной базе. "
             "Отвечай кратко и по делу, с опорой на данные. "
@@ -33,54 +58,87 @@ class QAService:
             "Каждая запись отдельным блоком, поля с новой строки."
         )
 
-        for chunk in chunks:
-            user_prompt = (
-                f"Вопрос:\n{question}\n\n"
-                f"Данные (фрагмент):\n{chunk}\n\n"
-                "Дай краткий ответ и перечисли 3-7 самых релевантных записей.\n"
-                "Формат примера:\n"
-                "1. [Лист]\n"
-                "   ДАТА: 01.02.2026\n"
-                "   СУТЬ: ...\n"
-                "\n"
-                "2. [Лист]\n"
-                "   ДАТА: ...\n"
-                "   СУТЬ: ...\n"
-                "Без Markdown."
-            )
-            answer = await self._openai.chat_text(system_prompt, user_prompt, model=model or self._openai.extract_model)
-            if answer:
-                intermediate_answers.append(_format_blocks(_strip_markdown(answer)))
+        model_name = model or self._openai.extract_model
+        overhead = sum(_count_tokens([system_prompt, _chunk_prompt(question, "")], model_name))
+        budget = max(CHUNK_TOKEN_BUDGET - overhead, 1000)
+
+        async def _answer_chunk(idx: int, chunk: str) -> tuple[int, str]:
+            async with self._chunk_sem:
+                answer = await self._openai.chat_text(system_prompt, _chunk_prompt(question, chunk), model=model_name)
+            return idx, _format_blocks(_strip_markdown(answer)) if answer else ""
+
+        # All chunks are packed up front (tokenizing is the expensive part and
+        # is already done by then); gather owns the requests, so cancelling
+        # answer_question cancels every one still in flight.
+        chunks = list(_iter_chunks(records, _count_tokens(records, model_name), budget))
+        results = await asyncio.gather(
+            *(_answer_chunk(idx, chunk) for idx, chunk in enumerate(chunks)),
+            return_exceptions=True,
+        )
+        answered: List[tuple[int, str]] = []
+        errors: List[BaseException] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error("Ошибка обработки фрагмента", exc_info=result)
+                errors.append(result)
+            else:
+                answered.append(result)
+        if errors and not answered:
+            raise errors[0]
+        answered.sort()
+        intermediate_answers = [formatted for _idx, formatted in answered if formatted]
 
         if len(intermediate_answers) == 1:
             return intermediate_answers[0]
 
-        final_prompt = (
-            f"Вопрос:\n{question}\n\n"
-            "Собери единый ответ на основе промежуточных результатов ниже. "
-            "Сделай короткое резюме и перечисли релевантные записи без Markdown:\n\n"
-            + "\n\n---\n\n".join(intermediate_answers)
-        )
-        final_answer = await self._openai.chat_text(system_prompt, final_prompt, model=model or self._openai.extract_model)
-        return _format_blocks(_strip_markdown(final_answer))
+        async def _merge(group: List[str]) -> str:
+            if len(group) == 1:
+                return group[0]
+            merge_prompt = (
+                f"Вопрос:\n{question}\n\n"
+                "Собери единый ответ на основе промежуточных результатов ниже. "
+                "Сделай короткое резюме и перечисли релевантные записи без Markdown:\n\n"
+                + "\n\n---\n\n".join(group)
+            )
+            async with self._chunk_sem:
+                merged = await self._openai.chat_text(system_prompt, merge_prompt, model=model_name)
+            return _format_blocks(_strip_markdown(merged))
+
+        # Tree reduction: neighbouring answers are merged pairwise in parallel
+        # until one remains, so no single merge prompt grows with the corpus.
+        level = intermediate_answers
+        while True:
+            level = list(
+                await asyncio.gather(*(_merge(level[idx : idx + 2]) for idx in range(0, max(len(level), 1), 2)))
+            )
+            if len(level) == 1:
+                return level[0]
 
     async def _collect_records(self, filters: "QueryFilters") -> List[str]:
         exclude = {"settings", "prompts", "inbox", "botsettings"}
         sheet_names = await self._sheets.list_worksheets()
         result: List[str] = []
 
-        for name in sheet_names:
-            if name.strip().lower() in exclude:
-                continue
-            if filters.sheet_names and name.strip().lower() not in filters.sheet_names:
-                continue
-            rows = await self._sheets.get_all_values(name)
+        wanted = [
+            name
+            for name in sheet_names
+            if name.strip().lower() not in exclude
+            and (not filters.sheet_names or name.strip().lower() in filters.sheet_names)
+        ]
+        rows_by_sheet = await self._sheets.batch_get_all_values(wanted)
+
+        for name in wanted:
+            rows = rows_by_sheet.get(name)
             if not rows:
                 continue
             headers = rows[0]
+            header_count = len(headers)
+            header_prefixes = [f"{header}: " for header in headers]
+            name_prefix = f"[{name}] "
             date_idx = _find_date_index(headers) if filters.start_date else None
             for row in rows[1:]:
-                if not any(cell.strip() for cell in row):
+                # Cheap all-"" check first; whitespace-only rows are rare.
+                if not any(row) or all(not cell or cell.isspace() for cell in row):
                     continue
                 if filters.start_date:
                     row_date = _extract_row_date(row, headers, date_idx)
@@ -88,85 +146,111 @@ class QAService:
                         continue
                     if row_date < filters.start_date or row_date > filters.end_date:
                         continue
-                pairs = []
-                for idx, header in enumerate(headers):
-                    value = row[idx] if idx < len(row) else ""
-                    pairs.append(f"{header}: {value}")
-                record = f"[{name}] " + "; ".join(pairs)
-                result.append(record)
+                if len(row) < header_count:
+                    row = row + [""] * (header_count - len(row))
+                result.append(name_prefix + "; ".join(prefix + value for prefix, value in zip(header_prefixes, row)))
 
         logger.info("Собрано записей для поиска: %s", len(result))
         return result
 
 
-def _chunk_records(records: List[str], max_chars: int) -> List[str]:
-    chunks: List[str] = []
-    current: List[str] = []
-    current_len = 0
-    for record in records:
-        record_len = len(record) + 1
-        if current_len + record_len > max_chars and current:
-            chunks.append("\n".join(current))
-            current = [record]
-            current_len = record_len
-        else:
-            current.append(record)
-            current_len += record_len
-    if current:
-        chunks.append("\n".join(current))
-    return chunks
+def _chunk_prompt(question: str, chunk: str) -> str:
+    return (
+        f"Вопрос:\n{question}\n\n"
+        f"Данные (фрагмент):\n{chunk}\n\n"
+        "Дай краткий ответ и перечисли 3-7 самых релевантных записей.\n"
+        "Формат примера:\n"
+        "1. [Лист]\n"
+        "   ДАТА: 01.02.2026\n"
+        "   СУТЬ: ...\n"
+        "\n"
+        "2. [Лист]\n"
+        "   ДАТА: ...\n"
+        "   СУТЬ: ...\n"
+        "Без Markdown."
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        logger.warning("tiktoken encoding unavailable for %s, estimating tokens", model)
+        return None
+
+
+def _count_tokens(texts: List[str], model: str) -> List[int]:
+    encoding = _get_encoding(model)
+    if encoding is None:
+        # Conservative estimate for mixed Cyrillic/Latin text.
+        return [len(text) // 3 + 1 for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
+
+def _iter_chunks(records: List[str], sizes: List[int], max_size: int) -> Iterator[str]:
+    # Greedy packing in record order: each chunk takes the longest run whose
+    # sizes (+1 per newline) fit max_size, or a single oversized record.
+    # Chunk ends are found by bisecting the running totals.
+    totals = list(itertools.accumulate(size + 1 for size in sizes[: len(records)]))
+    start = 0
+    while start < len(totals):
+        base = totals[start - 1] if start else 0
+        end = max(bisect.bisect_right(totals, base + max_size, lo=start), start + 1)
+        yield "\n".join(records[start:end])
+        start = end
 
 
 def _strip_markdown(text: str) -> str:
-    return (
-        text.replace("**", "")
-        .replace("__", "")
-        .replace("`", "")
-        .replace("*", "")
-    )
+    # "**" must go before "__" so "_**_" still collapses to "", and single
+    # underscores (snake_case, e-mails) are kept; the remaining single-char
+    # removals share one translate pass.
+    return text.replace("**", "").replace("__", "").translate(_MD_TABLE)
 
 
 def _format_blocks(text: str) -> str:
-    lines = text.splitlines()
     formatted: List[str] = []
+    append = formatted.append
+    match_header = _BLOCK_HEADER_RE.match
     block_open = False
     current_fields: List[str] = []
 
     def flush_fields() -> None:
-        nonlocal current_fields
         for field in current_fields:
-            if ":" in field:
-                key, value = field.split(":", 1)
-                key_norm = key.strip().lower()
-                value = _shorten_value(value.strip())
-                prefix = "📅" if key_norm in {"дата", "дата добавления", "date"} else "-"
-                formatted.append(f"   {prefix} {key.strip()}: {value}")
+            key, sep, value = field.partition(":")
+            if sep:
+                key = key.strip()
+                prefix = "📅" if key.lower() in _DATE_KEYS else "-"
+                append(f"   {prefix} {key}: {_shorten_value(value.strip())}")
             else:
-                formatted.append(f"   - {field}")
-        current_fields = []
+                append(f"   - {field}")
+        current_fields.clear()
 
-    for line in lines:
+    for line in text.splitlines():
         stripped = line.strip()
-        header_match = re.match(r"^(?:🧾\s*)?(\d+)\.\s*(.*)$", stripped)
+        # Only lines starting with a digit or the block emoji can be headers.
+        header_match = match_header(stripped) if stripped[:1].isdigit() or stripped[:1] == "🧾" else None
         if header_match:
             if block_open:
                 flush_fields()
-                formatted.append("────────")
+                append("────────")
             block_open = True
             number = header_match.group(1)
             rest = header_match.group(2).strip()
+            title = ""
             if rest:
-                parts = [part.strip() for part in rest.split(";") if part.strip()]
-                title = ""
+                parts = [part for part in map(str.strip, rest.split(";")) if part]
                 if parts and ":" not in parts[0]:
                     title = parts[0]
                     current_fields.extend(parts[1:])
                 else:
                     current_fields.extend(parts)
-                header = f"🧾 {number}. {title}".strip()
-                formatted.append(header)
-            else:
-                formatted.append(f"🧾 {number}.")
+            append(f"🧾 {number}. {title}" if title else f"🧾 {number}.")
             continue
 
         if block_open:
@@ -174,13 +258,13 @@ def _format_blocks(text: str) -> str:
                 continue
             if stripped == "────────":
                 flush_fields()
-                formatted.append("────────")
+                append("────────")
                 continue
             if ":" in stripped:
                 current_fields.append(stripped)
                 continue
 
-        formatted.append(line)
+        append(line)
 
     if block_open:
         flush_fields()
@@ -217,10 +301,7 @@ def _infer_filters(question: str) -> QueryFilters:
         filters.end_date = today - timedelta(days=2)
         return filters
 
-    match = re.search(
-        r"(?:за\s+последн\w*|последн\w*|за\s+прошл\w*|last)\s+(\d+)\s*(?:дн\w*|days)",
-        lowered,
-    )
+    match = _LAST_DAYS_RE.search(lowered)
     if match:
         days = int(match.group(1))
         days = max(1, min(days, 365))
@@ -259,11 +340,15 @@ def _extract_row_date(row: List[str], headers: List[str], idx: int | None) -> da
 
 
 def _parse_date(value: str) -> date | None:
-    if not value:
+    match = _DATE_DOT_RE.fullmatch(value)
+    if match:
+        day, month, year = match.groups()
+    else:
+        match = _DATE_ISO_RE.fullmatch(value)
+        if not match:
+            return None
+        year, month, day = match.groups()
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
         return None
-    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(value, fmt).date()
-        except ValueError:
-            continue
-    return None
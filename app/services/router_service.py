@@ -1,3 +1,4 @@
+import functools
 import logging
 from typing import Dict, List, Tuple
 
@@ -82,10 +83,10 @@ class RouterService:
             model=model or self._openai.extract_model,
         )
 
-        normalized_headers = {self._normalize(h): h for h in headers}
+        normalized_headers = _normalized_headers(tuple(headers))
         normalized_data: Dict[str, str] = {}
         for key, value in data.items():
-            norm = self._normalize(str(key))
+            norm = str(key).strip().lower()
             if norm in normalized_headers:
                 normalized_data[normalized_headers[norm]] = "" if value is None else str(value)
 
@@ -93,7 +94,14 @@ class RouterService:
             normalized_data.setdefault(header, "")
 
         for header in headers:
-            if self._normalize(header) == "дата" and not normalized_data.get(header).strip():
+            if header.strip().lower() == "дата" and not normalized_data.get(header).strip():
                 normalized_data[header] = today_str
 
         return [normalized_data.get(header, "") for header in headers]
+
+
+@functools.lru_cache(maxsize=32)
+def _normalized_headers(headers: Tuple[str, ...]) -> Dict[str, str]:
+    # Sheets keep the same header row across messages; the returned mapping is
+    # shared between calls and must not be mutated.
+    return {header.strip().lower(): header for header in headers}
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class SheetsBootCache:
+    # Remembers which worksheets were recently confirmed to exist, so startup
+    # can serve that answer and re-check in the background.
+    def __init__(self, cache_path: Path, max_age_seconds: float = 24 * 60 * 60) -> None:
+        self._path = cache_path
+        self._max_age = max_age_seconds
+
+    async def is_fresh(self, worksheet: str) -> bool:
+        def _read() -> bool:
+            if not self._path.exists():
+                return False
+            try:
+                with self._path.open("r", encoding="utf-8") as file:
+                    data = json.load(file)
+                checked_at = float(data.get("checked_at", 0))
+                worksheets = data.get("worksheets", [])
+            except (OSError, ValueError, TypeError, AttributeError):
+                logger.warning("Ignoring unreadable sheets cache %s", self._path)
+                return False
+            return worksheet in worksheets and time.time() - checked_at < self._max_age
+
+        return await asyncio.to_thread(_read)
+
+    async def mark_checked(self, worksheets: List[str]) -> None:
+        def _write() -> None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self._path.with_suffix(".tmp")
+            with temp_path.open("w", encoding="utf-8") as file:
+                json.dump({"worksheets": worksheets, "checked_at": time.time()}, file, ensure_ascii=False)
+            temp_path.replace(self._path)
+
+        await asyncio.to_thread(_write)
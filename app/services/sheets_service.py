@@ -1,30 +1,104 @@
 import asyncio
+import contextlib
+import functools
 import logging
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
 
 import gspread
+from google.oauth2.service_account import Credentials
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class SheetsService:
-    def __init__(self, spreadsheet: gspread.Spreadsheet) -> None:
+    def __init__(
+        self,
+        spreadsheet: gspread.Spreadsheet,
+        values_ttl: float = 15.0,
+        max_concurrent_calls: int = 5,
+        worksheets_ttl: float = 60.0,
+        max_revalidated_age: float = 300.0,
+        max_cached_sheets: int = 32,
+    ) -> None:
         self._spreadsheet = spreadsheet
+        # Caps parallel gspread requests so concurrent fan-outs stay within the
+        # per-user Sheets quota instead of saturating the default thread pool.
+        self._io_sem = asyncio.Semaphore(max_concurrent_calls)
         self._settings_cache: Dict[str, str] = {}
+        self._values_ttl = values_ttl
+        # sheet -> (fetched_at, checked_at, workbook revision, rows), in LRU order.
+        self._values_cache: "OrderedDict[str, Tuple[float, float, Optional[str], List[List[str]]]]" = OrderedDict()
+        self._max_cached_sheets = max_cached_sheets
+        # Past the TTL, rows are kept if the workbook revision (Drive's last
+        # modified time) is unchanged, but never longer than this since the
+        # actual fetch. Cleared once the Drive API turns out to be disabled.
+        self._max_revalidated_age = max_revalidated_age
+        self._revision_supported = True
+        self._values_locks: Dict[str, asyncio.Lock] = {}
+        # Bumped by invalidate_values; a fetch that overlapped a write sees a
+        # different generation and does not cache its (pre-write) rows.
+        self._values_gen: Dict[str, int] = {}
+        # The workbook layout rarely changes, so worksheet objects are reused
+        # instead of fetching spreadsheet metadata on every call.
+        self._ws_ttl = worksheets_ttl
+        self._ws_list_cache: Optional[Tuple[float, List[gspread.Worksheet]]] = None
+        # name -> (cached_at, worksheet); entries expire with the same TTL.
+        self._ws_cache: Dict[str, Tuple[float, gspread.Worksheet]] = {}
 
     @classmethod
-    async def create(cls, spreadsheet_id: str, service_account_path: Path) -> "SheetsService":
-        client = await asyncio.to_thread(
-            gspread.service_account,
-            filename=str(service_account_path),
-        )
+    async def create(
+        cls,
+        spreadsheet_id: str,
+        service_account_path: Optional[Path] = None,
+        credentials: Optional[Credentials] = None,
+    ) -> "SheetsService":
+        if credentials is None:
+            if service_account_path is None:
+                raise ValueError("Either service_account_path or credentials is required")
+            credentials = await asyncio.to_thread(load_credentials, service_account_path)
+        client = gspread.authorize(credentials)
         spreadsheet = await asyncio.to_thread(client.open_by_key, spreadsheet_id)
         return cls(spreadsheet)
 
+    async def _run(self, func: Callable[[], T]) -> T:
+        async with self._io_sem:
+            return await asyncio.to_thread(func)
+
+    def _get_ws(self, name: str) -> gspread.Worksheet:
+        entry = self._ws_cache.get(name)
+        if entry is not None and time.monotonic() - entry[0] <= self._ws_ttl:
+            return entry[1]
+        worksheet = self._spreadsheet.worksheet(name)
+        self._ws_cache[name] = (time.monotonic(), worksheet)
+        return worksheet
+
+    def _cached_worksheets(self) -> Optional[List[gspread.Worksheet]]:
+        entry = self._ws_list_cache
+        if entry is None or time.monotonic() - entry[0] > self._ws_ttl:
+            return None
+        return entry[1]
+
+    def _list_ws(self) -> List[gspread.Worksheet]:
+        worksheets = self._cached_worksheets()
+        if worksheets is None:
+            worksheets = self._spreadsheet.worksheets()
+            now = time.monotonic()
+            self._ws_list_cache = (now, worksheets)
+            self._ws_cache = {ws.title: (now, ws) for ws in worksheets}
+        return worksheets
+
+    def invalidate_worksheets(self) -> None:
+        self._ws_list_cache = None
+        self._ws_cache = {}
+
     async def load_settings(self) -> Dict[str, str]:
         def _read() -> Dict[str, str]:
-            worksheet = self._spreadsheet.worksheet("Settings")
+            worksheet = self._get_ws("Settings")
             rows = worksheet.get_all_values()
             mapping: Dict[str, str] = {}
             for row in rows:
@@ -39,22 +113,25 @@ class SheetsService:
                 mapping[category] = description
             return mapping
 
-        mapping = await asyncio.to_thread(_read)
+        mapping = await self._run(_read)
         self._settings_cache = mapping
         return mapping
 
     async def ensure_worksheet(self, name: str, rows: int = 100, cols: int = 2) -> gspread.Worksheet:
         def _ensure() -> gspread.Worksheet:
             try:
-                return self._spreadsheet.worksheet(name)
+                return self._get_ws(name)
             except gspread.exceptions.WorksheetNotFound:
-                return self._spreadsheet.add_worksheet(title=name, rows=rows, cols=cols)
+                worksheet = self._spreadsheet.add_worksheet(title=name, rows=rows, cols=cols)
+                self.invalidate_worksheets()
+                self._ws_cache[name] = (time.monotonic(), worksheet)
+                return worksheet
 
-        return await asyncio.to_thread(_ensure)
+        return await self._run(_ensure)
 
     async def get_prompts(self) -> Dict[str, str]:
         def _read() -> Dict[str, str]:
-            worksheet = self._spreadsheet.worksheet("Prompts")
+            worksheet = self._get_ws("Prompts")
             rows = worksheet.get_all_values()
             data: Dict[str, str] = {}
             for row in rows:
@@ -67,14 +144,14 @@ class SheetsService:
             return data
 
         try:
-            return await asyncio.to_thread(_read)
+            return await self._run(_read)
         except gspread.exceptions.WorksheetNotFound:
             await self.ensure_worksheet("Prompts")
             return {}
 
     async def set_prompt(self, key: str, value: str) -> None:
         def _upsert() -> None:
-            worksheet = self._spreadsheet.worksheet("Prompts")
+            worksheet = self._get_ws("Prompts")
             rows = worksheet.get_all_values()
             target_row: Optional[int] = None
             for idx, row in enumerate(rows, start=1):
@@ -90,38 +167,238 @@ class SheetsService:
                     worksheet.append_row(["Key", "Value"])
                 worksheet.append_row([key, value])
 
-        await asyncio.to_thread(_upsert)
+        await self._run(_upsert)
 
     async def get_headers(self, sheet_name: str) -> List[str]:
         def _read() -> List[str]:
-            worksheet = self._spreadsheet.worksheet(sheet_name)
+            worksheet = self._get_ws(sheet_name)
             return worksheet.row_values(1)
 
-        return await asyncio.to_thread(_read)
+        return await self._run(_read)
 
     async def get_all_values(self, sheet_name: str) -> List[List[str]]:
-        def _read() -> List[List[str]]:
-            worksheet = self._spreadsheet.worksheet(sheet_name)
-            return worksheet.get_all_values()
+        rows = (await self.batch_get_all_values([sheet_name])).get(sheet_name)
+        if rows is None:
+            raise gspread.exceptions.WorksheetNotFound(sheet_name)
+        return rows
 
-        return await asyncio.to_thread(_read)
+    async def batch_get_all_values(self, sheet_names: List[str]) -> Dict[str, List[List[str]]]:
+        # Sheets missing from the cache are read with one values.batchGet call.
+        # Sheets that no longer exist (renamed or deleted tabs) are left out.
+        result, stale = self._take_fresh(list(dict.fromkeys(sheet_names)))
+        if not stale:
+            return result
 
-    async def list_worksheets(self) -> List[str]:
-        def _read() -> List[str]:
-            return [ws.title for ws in self._spreadsheet.worksheets()]
+        # Concurrent readers of the same sheet share one fetch. Locks are
+        # taken in sorted order so overlapping batches cannot deadlock.
+        async with contextlib.AsyncExitStack() as stack:
+            for name in sorted(stale):
+                await stack.enter_async_context(self._values_locks.setdefault(name, asyncio.Lock()))
+            fresh, stale = self._take_fresh(stale)
+            result.update(fresh)
+            if not stale:
+                return result
+
+            revision: Optional[str] = None
+            if any(self._can_revalidate(name) for name in stale):
+                # One revision read covers every expired sheet in the batch.
+                revision = await self._read_revision()
+                to_fetch: List[str] = []
+                for name in stale:
+                    rows = self._revalidate(name, revision)
+                    if rows is not None:
+                        result[name] = rows
+                    else:
+                        to_fetch.append(name)
+                stale = to_fetch
+                if not stale:
+                    return result
+
+            generations = {name: self._values_gen.get(name, 0) for name in stale}
+            fetch = self._run(lambda: self._read_existing_ranges(stale))
+            if revision is None:
+                # Read alongside the values instead of before them. An edit
+                # racing the fetch can at worst stamp rows with a newer
+                # revision; max_revalidated_age bounds how long that lasts.
+                revision, fetched = await asyncio.gather(self._read_revision(), fetch)
+            else:
+                fetched = await fetch
+            for name, rows in fetched.items():
+                if self._values_gen.get(name, 0) == generations[name]:
+                    self._store_values(name, revision, rows)
+                result[name] = rows
+        return result
+
+    def _read_existing_ranges(self, sheet_names: List[str]) -> Dict[str, List[List[str]]]:
+        try:
+            return dict(zip(sheet_names, self._read_ranges(sheet_names)))
+        except gspread.exceptions.WorksheetNotFound:
+            # One stale name fails the whole batch: refresh the worksheet
+            # list and retry once with the sheets that still exist.
+            self.invalidate_worksheets()
+            existing = {ws.title for ws in self._list_ws()}
+            present = [name for name in sheet_names if name in existing]
+            if len(present) == len(sheet_names):
+                raise
+            if not present:
+                return {}
+            return dict(zip(present, self._read_ranges(present)))
+
+    def _read_ranges(self, sheet_names: List[str]) -> List[List[List[str]]]:
+        # values.batchGet needs no worksheet metadata lookup first, so even a
+        # single sheet costs one HTTP round trip instead of two.
+        try:
+            response = self._spreadsheet.values_batch_get([_sheet_range(name) for name in sheet_names])
+        except gspread.exceptions.APIError as exc:
+            if "Unable to parse range" in str(exc):
+                raise gspread.exceptions.WorksheetNotFound(", ".join(sheet_names)) from exc
+            raise
+        value_ranges = response.get("valueRanges", [])
+        return [
+            _pad_rows(value_ranges[idx].get("values", []) if idx < len(value_ranges) else [])
+            for idx in range(len(sheet_names))
+        ]
+
+    def invalidate_values(self, sheet_name: str) -> None:
+        self._values_cache.pop(sheet_name, None)
+        self._values_gen[sheet_name] = self._values_gen.get(sheet_name, 0) + 1
+
+    def _take_fresh(self, sheet_names: List[str]) -> Tuple[Dict[str, List[List[str]]], List[str]]:
+        # Splits sheet_names into rows still within the TTL and sheets that
+        # need a revision check or a fetch.
+        now = time.monotonic()
+        fresh: Dict[str, List[List[str]]] = {}
+        stale: List[str] = []
+        for name in sheet_names:
+            entry = self._values_cache.get(name)
+            if entry is not None and now - entry[1] <= self._values_ttl:
+                self._values_cache.move_to_end(name)
+                fresh[name] = entry[3]
+            else:
+                stale.append(name)
+        return fresh, stale
+
+    def _can_revalidate(self, sheet_name: str) -> bool:
+        entry = self._values_cache.get(sheet_name)
+        return (
+            self._revision_supported
+            and entry is not None
+            and entry[2] is not None
+            and time.monotonic() - entry[0] <= self._max_revalidated_age
+        )
 
-        return await asyncio.to_thread(_read)
+    def _revalidate(self, sheet_name: str, revision: Optional[str]) -> Optional[List[List[str]]]:
+        if revision is None or not self._can_revalidate(sheet_name):
+            return None
+        fetched_at, _checked_at, cached_revision, rows = self._values_cache[sheet_name]
+        if cached_revision != revision:
+            return None
+        self._values_cache[sheet_name] = (fetched_at, time.monotonic(), revision, rows)
+        self._values_cache.move_to_end(sheet_name)
+        return rows
+
+    def _store_values(self, sheet_name: str, revision: Optional[str], rows: List[List[str]]) -> None:
+        now = time.monotonic()
+        self._values_cache[sheet_name] = (now, now, revision, rows)
+        self._values_cache.move_to_end(sheet_name)
+        while len(self._values_cache) > self._max_cached_sheets:
+            self._values_cache.popitem(last=False)
+
+    async def _read_revision(self) -> Optional[str]:
+        # None means "unknown": the affected rows are simply refetched.
+        if not self._revision_supported:
+            return None
+        try:
+            return await self._run(self._spreadsheet.get_lastUpdateTime)
+        except gspread.exceptions.APIError as exc:
+            if _status_code(exc) == 403:
+                # Usually the Drive API is not enabled for the project; stop
+                # asking instead of failing a round trip on every read.
+                self._revision_supported = False
+                logger.warning("Spreadsheet revision checks disabled (Drive API unavailable): %s", exc)
+            else:
+                logger.warning("Could not read spreadsheet revision: %s", exc)
+        except Exception as exc:
+            logger.warning("Could not read spreadsheet revision: %s", exc)
+        return None
+
+    async def list_worksheets(self) -> List[str]:
+        worksheets = self._cached_worksheets()
+        if worksheets is None:
+            worksheets = await self._run(self._list_ws)
+        return [ws.title for ws in worksheets]
 
     async def append_row(self, sheet_name: str, values: List[str]) -> None:
         def _append() -> None:
-            worksheet = self._spreadsheet.worksheet(sheet_name)
+            worksheet = self._get_ws(sheet_name)
             worksheet.append_row(values, value_input_option="USER_ENTERED")
 
-        await asyncio.to_thread(_append)
+        try:
+            await self._run(_append)
+        except Exception:
+            # A stale cached worksheet (renamed or removed sheet) is refetched next time.
+            self.invalidate_worksheets()
+            raise
+        finally:
+            self.invalidate_values(sheet_name)
+
+    async def append_rows_batch(self, entries: List[Tuple[str, List[str]]]) -> None:
+        # One values.append per sheet instead of a worksheet lookup +
+        # values.append round trip per row. Sheets are written one after
+        # another in the order they first appear (category before Inbox), so
+        # a failure never leaves a later sheet written ahead of an earlier one.
+        rows_by_sheet: Dict[str, List[List[str]]] = {}
+        for sheet_name, values in entries:
+            rows_by_sheet.setdefault(sheet_name, []).append(values)
+
+        def _append(sheet_name: str, rows: List[List[str]]) -> None:
+            try:
+                self._spreadsheet.values_append(
+                    _sheet_range(sheet_name),
+                    params={"valueInputOption": "USER_ENTERED"},
+                    body={"values": rows},
+                )
+            except gspread.exceptions.APIError as exc:
+                if "Unable to parse range" in str(exc):
+                    raise gspread.exceptions.WorksheetNotFound(sheet_name) from exc
+                raise
+
+        for sheet_name, rows in rows_by_sheet.items():
+            try:
+                await self._run(functools.partial(_append, sheet_name, rows))
+            finally:
+                self.invalidate_values(sheet_name)
 
     async def delete_row(self, sheet_name: str, row_index: int) -> None:
         def _delete() -> None:
-            worksheet = self._spreadsheet.worksheet(sheet_name)
+            worksheet = self._get_ws(sheet_name)
             worksheet.delete_rows(row_index)
 
-        await asyncio.to_thread(_delete)
+        try:
+            await self._run(_delete)
+        except Exception:
+            # A stale cached worksheet (renamed or removed sheet) is refetched next time.
+            self.invalidate_worksheets()
+            raise
+        finally:
+            self.invalidate_values(sheet_name)
+
+
+def load_credentials(service_account_path: Path) -> Credentials:
+    return Credentials.from_service_account_file(str(service_account_path), scopes=gspread.auth.DEFAULT_SCOPES)
+
+
+def _status_code(exc: gspread.exceptions.APIError) -> Optional[int]:
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _sheet_range(sheet_name: str) -> str:
+    # A bare quoted sheet name selects the whole sheet; quotes are doubled.
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+
+def _pad_rows(rows: List[List[str]]) -> List[List[str]]:
+    # values.batchGet trims trailing empty cells; pad like Worksheet.get_all_values.
+    width = max((len(row) for row in rows), default=0)
+    return [row + [""] * (width - len(row)) for row in rows]
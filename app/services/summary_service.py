@@ -1,7 +1,9 @@
+import heapq
 import logging
+import re
 from collections import Counter
-from datetime import date, datetime, timedelta
-from typing import List, Tuple
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
 
 import gspread.exceptions
 
@@ -10,45 +12,47 @@ from app.services.sheets_service import SheetsService
 
 logger = logging.getLogger(__name__)
 
+_DATE_DOT_RE = re.compile(r"([0-9]{1,2})\.([0-9]{1,2})\.([0-9]{4})")
+_DATE_ISO_RE = re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})")
+
 
 class SummaryService:
     def __init__(self, openai_service: OpenAIService, sheets_service: SheetsService) -> None:
         self._openai = openai_service
         self._sheets = sheets_service
+        # (Inbox rows object, date -> [(position, row)]); rebuilt whenever
+        # SheetsService hands out a new rows object, e.g. after an append.
+        self._date_index: Optional[Tuple[List[List[str]], Dict[date, List[Tuple[int, List[str]]]]]] = None
 
     async def daily_summary(self, target_date: date) -> Tuple[str, int]:
-        rows = await self._get_inbox_rows()
-        filtered = [row for row in rows if _parse_date(row[0]) == target_date]
+        index = await self._get_inbox_index()
+        filtered = [row for _position, row in index.get(target_date, [])]
         return await self._build_summary(filtered, f"за {_format_date(target_date)}")
 
     async def weekly_summary(self, end_date: date) -> Tuple[str, int]:
-        rows = await self._get_inbox_rows()
+        index = await self._get_inbox_index()
         start_date = end_date - timedelta(days=6)
-        filtered = [
-            row
-            for row in rows
-            if (row_date := _parse_date(row[0])) is not None
-            and start_date <= row_date <= end_date
-        ]
+        days = (index.get(start_date + timedelta(days=offset), []) for offset in range(7))
+        # Each day's list is in sheet order; merge keeps the overall sheet order.
+        filtered = [row for _position, row in heapq.merge(*days, key=lambda item: item[0])]
         period = f"за период {_format_date(start_date)} — {_format_date(end_date)}"
         return await self._build_summary(filtered, period)
 
-    async def _get_inbox_rows(self) -> List[List[str]]:
+    async def _get_inbox_index(self) -> Dict[date, List[Tuple[int, List[str]]]]:
         try:
             rows = await self._sheets.get_all_values("Inbox")
         except gspread.exceptions.WorksheetNotFound:
             logger.warning("Inbox sheet not found, summary will be empty")
-            return []
-        if not rows:
-            return []
-        # Skip header row if first cell doesn't look like a date (DD.MM.YYYY or YYYY-MM-DD)
-        first_row = rows[0]
-        first_cell = (first_row[0] if len(first_row) > 0 else "").strip()
-        if _parse_date(first_cell) is not None:
-            data_rows = rows
-        else:
-            data_rows = rows[1:]
-        return [row for row in data_rows if row]
+            return {}
+        if self._date_index is not None and self._date_index[0] is rows:
+            return self._date_index[1]
+        index: Dict[date, List[Tuple[int, List[str]]]] = {}
+        for position, row in enumerate(_inbox_data_rows(rows)):
+            row_date = _parse_date(row[0])
+            if row_date is not None:
+                index.setdefault(row_date, []).append((position, row))
+        self._date_index = (rows, index)
+        return index
 
     async def _build_summary(self, rows: List[List[str]], period: str) -> Tuple[str, int]:
         if not rows:
@@ -94,13 +98,32 @@ class SummaryService:
         return header, len(rows)
 
 
+def _inbox_data_rows(rows: List[List[str]]) -> List[List[str]]:
+    if not rows:
+        return []
+    # Skip header row if first cell doesn't look like a date (DD.MM.YYYY or YYYY-MM-DD)
+    first_row = rows[0]
+    first_cell = (first_row[0] if len(first_row) > 0 else "").strip()
+    if _parse_date(first_cell) is not None:
+        data_rows = rows
+    else:
+        data_rows = rows[1:]
+    return [row for row in data_rows if row]
+
+
 def _parse_date(value: str) -> date | None:
-    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(value, fmt).date()
-        except ValueError:
-            continue
-    return None
+    match = _DATE_DOT_RE.fullmatch(value)
+    if match:
+        day, month, year = match.groups()
+    else:
+        match = _DATE_ISO_RE.fullmatch(value)
+        if not match:
+            return None
+        year, month, day = match.groups()
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
 
 
 def _normalize_bullets(text: str) -> str:
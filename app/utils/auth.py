@@ -1,9 +1,18 @@
-from typing import Optional
+from typing import AbstractSet, NamedTuple, Optional
 
 from aiogram.types import User
 
 
-def is_allowed(user: Optional[User], allowed_user_ids: list[int], allowed_usernames: list[str]) -> bool:
+class AuthConfig(NamedTuple):
+    allowed_user_ids: AbstractSet[int]
+    # Must already be normalized (lower-case, no "@"), as Config guarantees.
+    allowed_usernames: AbstractSet[str]
+
+
+def is_allowed(user: Optional[User], auth: AuthConfig) -> bool:
+    # Called on every update. Only the incoming name needs folding, and most
+    # Telegram usernames match before lower().
+    allowed_user_ids, allowed_usernames = auth
     if not allowed_user_ids and not allowed_usernames:
         return True
     if not user:
@@ -11,8 +20,8 @@ def is_allowed(user: Optional[User], allowed_user_ids: list[int], allowed_userna
     if allowed_user_ids and user.id not in allowed_user_ids:
         return False
     if allowed_usernames:
-        username = (user.username or "").lower()
-        if username not in allowed_usernames:
+        username = user.username or ""
+        if username not in allowed_usernames and username.lower() not in allowed_usernames:
             return False
     return True
 
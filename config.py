@@ -1,60 +1,99 @@
-from dataclasses import dataclass
 from pathlib import Path
+import logging
 import os
-from typing import List
+import re
+from typing import FrozenSet, List, Mapping, NamedTuple, Optional
 
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent
 ENV_PATH = BASE_DIR / ".env"
-load_dotenv(dotenv_path=ENV_PATH)
+_COMPILED_ENV_PATH = BASE_DIR / "env_compiled.py"
 
+_REQUIRED_VARS = ("TELEGRAM_TOKEN", "OPENAI_API_KEY", "GOOGLE_SHEET_ID")
+# The allow-lists are included: skipping .env while it holds them would
+# silently open the bot to everyone.
+_ENV_VARS = _REQUIRED_VARS + ("ALLOWED_USER_IDS", "ALLOWED_USERNAMES")
 
-@dataclass(frozen=True)
-class Config:
+# Under systemd (EnvironmentFile=.env) or a container env_file everything is
+# already exported, so .env is neither parsed nor imported.
+def _load_env() -> None:
+    # Pre-parsed .env from scripts/compile_env.py skips reading .env at
+    # startup, but only while it is at least as new as .env: a rotated token
+    # or a removed user must not keep working off a stale copy.
+    try:
+        stale = ENV_PATH.stat().st_mtime_ns > _COMPILED_ENV_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        stale = False
+    if stale:
+        logging.getLogger(__name__).warning(
+            "%s is older than .env, ignoring it; re-run scripts/compile_env.py", _COMPILED_ENV_PATH.name
+        )
+    else:
+        try:
+            import env_compiled  # noqa: F401
+            return
+        except ImportError:
+            pass
+    load_dotenv(dotenv_path=ENV_PATH)
+
+
+if not all(name in os.environ for name in _ENV_VARS):
+    _load_env()
+
+# A comma-separated item that is only digits (surrounding whitespace allowed);
+# anything else, e.g. "12 34" or "-5", is skipped.
+_INT_ITEM_RE = re.compile(r"(?:^|,)\s*(\d+)\s*(?=,|$)")
+
+
+class Config(NamedTuple):
     telegram_token: str
     openai_api_key: str
     google_sheet_id: str
-    allowed_user_ids: List[int]
-    allowed_usernames: List[str]
-
-    @staticmethod
-    def _parse_int_list(value: str) -> List[int]:
-        items = [item.strip() for item in value.split(",") if item.strip()]
-        result: List[int] = []
-        for item in items:
-            if item.isdigit():
-                result.append(int(item))
-        return result
-
-    @staticmethod
-    def _parse_str_list(value: str) -> List[str]:
-        return [item.strip().lstrip("@").lower() for item in value.split(",") if item.strip()]
-
-    @classmethod
-    def from_env(cls) -> "Config":
-        telegram_token = os.getenv("TELEGRAM_TOKEN", "").strip()
-        openai_api_key = os.getenv("OPENAI_API_KEY", "").strip()
-        google_sheet_id = os.getenv("GOOGLE_SHEET_ID", "").strip()
-        allowed_user_ids = cls._parse_int_list(os.getenv("ALLOWED_USER_IDS", ""))
-        allowed_usernames = cls._parse_str_list(os.getenv("ALLOWED_USERNAMES", ""))
-
-        missing = [
-            name
-            for name, value in (
-                ("TELEGRAM_TOKEN", telegram_token),
-                ("OPENAI_API_KEY", openai_api_key),
-                ("GOOGLE_SHEET_ID", google_sheet_id),
-            )
-            if not value
-        ]
-        if missing:
-            raise ValueError(f"Missing required env vars: {', '.join(missing)}")
-
-        return cls(
-            telegram_token=telegram_token,
-            openai_api_key=openai_api_key,
-            google_sheet_id=google_sheet_id,
-            allowed_user_ids=allowed_user_ids,
-            allowed_usernames=allowed_usernames,
-        )
+    allowed_user_ids: FrozenSet[int]
+    # Normalized once at parse time: lower-case, without a leading "@".
+    # is_allowed relies on this and never normalizes the configured names.
+    allowed_usernames: FrozenSet[str]
+
+
+_cached_config: Optional[Config] = None
+
+
+def _parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in _INT_ITEM_RE.findall(value)]
+
+
+def _parse_str_list(value: str) -> List[str]:
+    return [item.lstrip("@").lower() for raw in value.split(",") if (item := raw.strip())]
+
+
+def load_config(env: Optional[Mapping[str, str]] = None) -> Config:
+    # os.environ is read once per process; call clear_config_cache() to re-read it.
+    # An explicit mapping (e.g. in tests) bypasses the cache.
+    global _cached_config
+    use_cache = env is None
+    if use_cache and _cached_config is not None:
+        return _cached_config
+    source: Mapping[str, str] = os.environ if env is None else env
+
+    required = {name: source.get(name, "").strip() for name in _REQUIRED_VARS}
+    if not all(required.values()):
+        # Only the error path builds the list, and it still names every missing var.
+        missing = [name for name, value in required.items() if not value]
+        raise ValueError(f"Missing required env vars: {', '.join(missing)}")
+
+    config = Config(
+        telegram_token=required["TELEGRAM_TOKEN"],
+        openai_api_key=required["OPENAI_API_KEY"],
+        google_sheet_id=required["GOOGLE_SHEET_ID"],
+        allowed_user_ids=frozenset(_parse_int_list(source.get("ALLOWED_USER_IDS", ""))),
+        allowed_usernames=frozenset(_parse_str_list(source.get("ALLOWED_USERNAMES", ""))),
+    )
+    if use_cache:
+        _cached_config = config
+    return config
+
+
+def clear_config_cache() -> None:
+    global _cached_config
+    _cached_config = None
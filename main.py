@@ -1,99 +1,187 @@
 import asyncio
+import importlib
 import logging
+import os
 from pathlib import Path
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from typing import TYPE_CHECKING, Any, Awaitable, List, Optional
 
-from app.handlers.voice import create_voice_router
-from app.handlers.start import create_start_router
-from app.handlers.settings import create_settings_router
-from app.handlers.delete import create_delete_router
 from app.logging_setup import setup_logging
-from app.scheduler import scheduler_loop
-from app.services.bot_settings_service import BotSettingsService
-from app.services.delete_service import DeleteService
-from app.services.intent_service import IntentService
-from app.services.openai_service import OpenAIService
-from app.services.qa_service import QAService
-from app.services.router_service import RouterService
-from app.services.sheets_service import SheetsService
-from app.services.summary_service import SummaryService
-from config import Config
+from config import BASE_DIR, ENV_PATH, Config, load_config
+
+if TYPE_CHECKING:
+    from app.services.sheets_boot_cache import SheetsBootCache
+    from app.services.sheets_service import SheetsService
+
+
+_SERVICE_ACCOUNT_NAMES = ("service_account.json", "service_account.json.json")
+_service_account_path: Optional[Path] = None
+
+
+def _find_service_account(base_dir: Path) -> Path:
+    # One directory listing covers both candidate names; the result is kept
+    # for later main() runs in the same process.
+    global _service_account_path
+    if _service_account_path is not None:
+        return _service_account_path
+    with os.scandir(base_dir) as entries:
+        found = {entry.name: entry for entry in entries if entry.name in _SERVICE_ACCOUNT_NAMES}
+    primary, fallback = _SERVICE_ACCOUNT_NAMES
+    entry = found.get(primary) or found.get(fallback)
+    if entry is None:
+        raise FileNotFoundError(
+            f"Service account key not found in {base_dir / primary} or {base_dir / fallback}"
+        )
+    if entry.name == fallback:
+        logging.getLogger(__name__).warning("service_account.json not found, using %s", fallback)
+    _service_account_path = Path(entry.path)
+    return _service_account_path
+
+
+def _load_config() -> Config:
+    logger = logging.getLogger(__name__)
+    try:
+        # Pre-built by scripts/bake_config.py; skips env lookups and parsing.
+        import _baked_config
+    except ImportError:
+        return load_config()
+    baked_path = Path(_baked_config.__file__)
+    try:
+        stale = ENV_PATH.stat().st_mtime_ns > baked_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        stale = False
+    if stale:
+        logger.warning("%s is older than .env, ignoring it; re-run scripts/bake_config.py", baked_path.name)
+        return load_config()
+    logger.info("Using baked config from %s; the environment is not read", baked_path.name)
+    return _baked_config.CONFIG
+
+
+async def _gather_or_cancel(*aws: Awaitable[Any]) -> List[Any]:
+    # Like gather(), but if one awaitable fails the others are cancelled and
+    # awaited instead of being left running unowned.
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def _ensure_inbox(
+    sheets_service: "SheetsService", boot_cache: "SheetsBootCache", raise_errors: bool = False
+) -> None:
+    logger = logging.getLogger(__name__)
+    try:
+        await sheets_service.ensure_worksheet("Inbox", rows=1000, cols=10)
+    except Exception:
+        if raise_errors:
+            raise
+        logger.exception("Background Inbox check failed")
+        return
+    try:
+        await boot_cache.mark_checked(["Inbox"])
+    except Exception:
+        # The boot cache is only an optimisation; Inbox itself is fine.
+        logger.warning("Could not update the sheets boot cache", exc_info=True)
 
 
 async def main() -> None:
     setup_logging()
-    config = Config.from_env()
+    config = _load_config()
+
+    # aiogram, openai, gspread and httpx come in through these modules; they
+    # are imported here so importing main (tests, tooling) stays cheap and a
+    # bad config fails before paying for them.
+    from aiogram import Bot, Dispatcher
+
+    from app.fsm_storage import SqliteStorage
+    from app.scheduler import scheduler_loop
+    from app.services.bot_settings_service import BotSettingsService
+    from app.services.container import Services
+    from app.services.delete_service import DeleteService
+    from app.services.intent_service import IntentService
+    from app.services.openai_service import OpenAIService
+    from app.services.qa_service import QAService
+    from app.services.router_service import RouterService
+    from app.services.sheets_boot_cache import SheetsBootCache
+    from app.services.sheets_service import SheetsService
+    from app.services.summary_service import SummaryService
+    from app.utils.auth import AuthConfig
+
     logger = logging.getLogger(__name__)
 
-    base_dir = Path(__file__).resolve().parent
-    service_account_path = base_dir / "service_account.json"
-    if not service_account_path.exists():
-        fallback_path = base_dir / "service_account.json.json"
-        if fallback_path.exists():
-            logger.warning("service_account.json not found, using %s", fallback_path.name)
-            service_account_path = fallback_path
-        else:
-            raise FileNotFoundError(
-                f"Service account key not found in {service_account_path} or {fallback_path}"
-            )
+    service_account_path = _find_service_account(BASE_DIR)
 
     openai_service = OpenAIService(api_key=config.openai_api_key)
-    sheets_service = await SheetsService.create(
-        spreadsheet_id=config.google_sheet_id,
-        service_account_path=service_account_path,
-    )
-    await sheets_service.ensure_worksheet("Inbox", rows=1000, cols=10)
-    router_service = RouterService(openai_service)
-    intent_service = IntentService(openai_service)
-    settings_service = BotSettingsService(base_dir / "data" / "settings.json")
-    qa_service = QAService(openai_service, sheets_service)
-    delete_service = DeleteService(sheets_service)
-    summary_service = SummaryService(openai_service, sheets_service)
-
     bot = Bot(token=config.telegram_token)
-    dp = Dispatcher(storage=MemoryStorage())
-    dp.include_router(
-        create_voice_router(
-            openai_service,
-            sheets_service,
-            router_service,
-            intent_service,
-            settings_service,
-            qa_service,
-            delete_service,
-            allowed_user_ids=config.allowed_user_ids,
-            allowed_usernames=config.allowed_usernames,
-        )
-    )
-    dp.include_router(
-        create_start_router(
-            settings_service,
-            allowed_user_ids=config.allowed_user_ids,
-            allowed_usernames=config.allowed_usernames,
-        )
-    )
-    dp.include_router(
-        create_delete_router(
-            delete_service,
-            allowed_user_ids=config.allowed_user_ids,
-            allowed_usernames=config.allowed_usernames,
+    # Background tasks live exactly as long as the bot: they are cancelled
+    # and awaited on shutdown instead of being left as loose tasks (which
+    # also keeps them from being garbage-collected mid-flight). Startup runs
+    # inside the same try, so a failed start still closes both HTTP pools.
+    background_tasks: List["asyncio.Task[None]"] = []
+    try:
+        boot_cache = SheetsBootCache(BASE_DIR / "data" / ".sheets_cache.json")
+        # Independent startup round trips run together: the Sheets login, the
+        # token check (aiogram caches getMe, so polling reuses it) and the boot
+        # cache read.
+        sheets_service, bot_user, inbox_fresh = await _gather_or_cancel(
+            SheetsService.create(
+                spreadsheet_id=config.google_sheet_id,
+                service_account_path=service_account_path,
+            ),
+            bot.me(),
+            boot_cache.is_fresh("Inbox"),
         )
-    )
-    dp.include_router(
-        create_settings_router(
-            sheets_service,
-            settings_service,
-            summary_service,
-            allowed_user_ids=config.allowed_user_ids,
-            allowed_usernames=config.allowed_usernames,
+        logger.info("Authorized as @%s", bot_user.username)
+        if inbox_fresh:
+            # Stale-while-revalidate: Inbox existed recently, so don't block
+            # startup on the Sheets API; confirm it in the background.
+            background_tasks.append(asyncio.create_task(_ensure_inbox(sheets_service, boot_cache)))
+        else:
+            await _ensure_inbox(sheets_service, boot_cache, raise_errors=True)
+        services = Services(
+            openai=openai_service,
+            sheets=sheets_service,
+            router=RouterService(openai_service),
+            intent=IntentService(openai_service),
+            settings=BotSettingsService(BASE_DIR / "data" / "settings.json"),
+            qa=QAService(openai_service, sheets_service),
+            delete=DeleteService(sheets_service),
+            summary=SummaryService(openai_service, sheets_service),
         )
-    )
+        auth = AuthConfig(config.allowed_user_ids, config.allowed_usernames)
+
+        dp = Dispatcher(storage=SqliteStorage(BASE_DIR / "data" / "fsm.sqlite"))
+        # (module, factory), in dispatch order. Each handler module is imported
+        # only when its router is built.
+        routers = [
+            ("app.handlers.voice", "create_voice_router"),
+            ("app.handlers.start", "create_start_router"),
+            ("app.handlers.delete", "create_delete_router"),
+            ("app.handlers.settings", "create_settings_router"),
+        ]
+        for module_name, factory_name in routers:
+            factory = getattr(importlib.import_module(module_name), factory_name)
+            dp.include_router(factory(services, auth=auth))
 
-    asyncio.create_task(scheduler_loop(bot, settings_service, summary_service))
-    logger.info("Bot started")
-    await dp.start_polling(bot)
+        background_tasks.append(asyncio.create_task(scheduler_loop(bot, services.settings, services.summary)))
+        logger.info("Bot started")
+        await dp.start_polling(bot)
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await openai_service.close()
+        await bot.session.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        # Optional libuv-based event loop (Linux/macOS only); asyncio's default loop otherwise.
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
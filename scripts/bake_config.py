@@ -0,0 +1,45 @@
+"""Bake the parsed Config into _baked_config.py so main.py can skip env parsing.
+
+Run at deploy/build time once the environment (or .env) is final, and re-run
+after every change: while _baked_config.py exists, the environment is ignored.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from config import load_config  # noqa: E402
+
+OUTPUT_PATH = BASE_DIR / "_baked_config.py"
+
+
+def main() -> int:
+    try:
+        config = load_config()
+    except ValueError as exc:
+        print(f"❌ {exc}")
+        return 1
+
+    # Config is a NamedTuple of str and frozenset fields, so its repr is
+    # valid Python that rebuilds the same value.
+    lines = [
+        "# Generated by scripts/bake_config.py. Do not edit or commit.",
+        "from config import Config",
+        "",
+        f"CONFIG = {config!r}",
+    ]
+    # The file holds secrets, so create it readable by the owner only.
+    fd = os.open(OUTPUT_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as output:
+        output.write("\n".join(lines) + "\n")
+    # O_CREAT's mode only applies to new files; tighten an existing one too.
+    os.chmod(OUTPUT_PATH, 0o600)
+    print(f"✅ Записано: {OUTPUT_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Compile .env into env_compiled.py so config.py can skip parsing it at startup.
+
+Re-run after every change to .env: while env_compiled.py exists, .env is not read.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ENV_PATH = BASE_DIR / ".env"
+OUTPUT_PATH = BASE_DIR / "env_compiled.py"
+
+
+def main() -> int:
+    if not ENV_PATH.exists():
+        print(f"❌ Файл .env не найден: {ENV_PATH}")
+        return 1
+
+    lines = [
+        "# Generated by scripts/compile_env.py from .env. Do not edit or commit.",
+        "import os",
+        "",
+    ]
+    for key, value in dotenv_values(ENV_PATH).items():
+        if value is None:
+            continue
+        # setdefault keeps load_dotenv semantics: real environment variables win.
+        lines.append(f"os.environ.setdefault({key!r}, {value!r})")
+
+    # The file holds secrets, so create it readable by the owner only.
+    fd = os.open(OUTPUT_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as output:
+        output.write("\n".join(lines) + "\n")
+    # O_CREAT's mode only applies to new files; tighten an existing one too.
+    os.chmod(OUTPUT_PATH, 0o600)
+    print(f"✅ Записано: {OUTPUT_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -44,7 +44,7 @@ if [ -d "$APP_DIR/.venv" ]; then
 fi
 python3 -m venv "$APP_DIR/.venv"
 "$APP_DIR/.venv/bin/pip" install --upgrade pip
-"$APP_DIR/.venv/bin/pip" install aiogram openai gspread python-dotenv
+"$APP_DIR/.venv/bin/pip" install aiogram openai gspread python-dotenv uvloop
 
 SERVICE_FILE="/etc/systemd/system/${SERVICE_NAME}.service"
 